@@ -0,0 +1,70 @@
+"""End-of-day absence finalization.
+
+Students who never scan have no ``Attendance`` row for the day. :func:`finalize_day`
+fills those gaps with ``absent`` rows using one ``INSERT ... SELECT ... WHERE NOT
+EXISTS`` per day, so the cost does not grow with a per-student loop and running it
+twice for the same day inserts nothing the second time.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import events, rollup
+from .models import Attendance, Student
+
+
+def finalize_day(day):
+    """Insert an ``absent`` row for every student without a row on ``day``.
+
+    Students created after ``day`` are left out. Returns the number of rows inserted.
+    """
+    ops = connection.ops
+    q = ops.quote_name
+    attendance = q(Attendance._meta.db_table)
+    student = q(Student._meta.db_table)
+    # Students added during the day still count; those added later do not.
+    next_day = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+    sql = (
+        f"INSERT INTO {attendance} ({q('student_id')}, {q('date')}, {q('status')}, {q('timestamp')}, {q('login_time')}) "
+        f"SELECT s.{q('id')}, %s, %s, %s, NULL FROM {student} s "
+        f"WHERE s.{q('created_at')} < %s AND NOT EXISTS ("
+        f"SELECT 1 FROM {attendance} a WHERE a.{q('student_id')} = s.{q('id')} AND a.{q('date')} = %s) "
+        # A scan racing the finalization wins; its row is kept as recorded.
+        f"ON CONFLICT ({q('student_id')}, {q('date')}) DO NOTHING "
+        f"RETURNING {q('student_id')}"
+    )
+    params = [
+        ops.adapt_datefield_value(day),
+        'absent',
+        ops.adapt_datetimefield_value(timezone.now()),
+        ops.adapt_datetimefield_value(next_day),
+        ops.adapt_datefield_value(day),
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            created = [row[0] for row in cursor.fetchall()]
+        events.record((pk, day, 'absent', None) for pk in created)
+        rollup.refresh((pk, day) for pk in created)
+    return len(created)
+
+
+def school_days(start, end, include_weekends=False):
+    """Dates from ``start`` to ``end`` inclusive, Monday to Friday unless ``include_weekends``."""
+    day = start
+    while day <= end:
+        if include_weekends or day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def is_day_closed(day, lookup):
+    """``True`` once a scan on ``day`` could only be recorded as absent anyway, under
+    the school default and every section schedule in ``lookup``
+    (an ``attendance.schedules.Lookup``)."""
+    now = timezone.localtime()
+    if day != now.date():
+        return day < now.date()
+    closes_at = lookup.closing_time(day.weekday())
+    return closes_at is not None and now.time() > closes_at
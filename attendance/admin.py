@@ -1,15 +1,86 @@
+from django import forms
 from django.contrib import admin
-from .models import Student, Attendance
+from .models import Student, Attendance, ArchivedAttendance, Schedule, Section
+from . import rollup
+from .archive import archived_through
+from .search import search_students
+
+class ScheduleInline(admin.TabularInline):
+    model = Schedule
+    extra = 0
+
+@admin.register(Section)
+class SectionAdmin(admin.ModelAdmin):
+    list_display = ("name", "created_at")
+    search_fields = ("name",)
+    inlines = [ScheduleInline]
 
 @admin.register(Student)
 class StudentAdmin(admin.ModelAdmin):
-    list_display = ("name", "student_id", "email", "created_at")
+    list_display = ("name", "student_id", "email", "section", "created_at")
+    list_filter = ("section",)
     search_fields = ("name", "student_id", "email")
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_students(queryset, search_term), False
+
+class AttendanceAdminForm(forms.ModelForm):
+    class Meta:
+        model = Attendance
+        fields = "__all__"
+
+    # Archived months are read-only; a row added there would shadow the archived history.
+    def clean_date(self):
+        day = self.cleaned_data["date"]
+        last = archived_through()
+        if last is not None and day <= last:
+            raise forms.ValidationError(f"Days up to {last} are archived and cannot be changed.")
+        return day
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
+    form = AttendanceAdminForm
     list_display = ("student", "date", "status", "timestamp")
     list_filter = ("date", "status")
     search_fields = ("student__name", "student__student_id")
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_students(queryset, search_term, fields=("name", "student_id"), prefix="student__"), False
+
+    # Admin edits bypass the sign-in path, so resync the monthly rollup rows they touch.
+    def save_model(self, request, obj, form, change):
+        keys = [(obj.student_id, obj.date)]
+        if change:
+            keys += Attendance.objects.filter(pk=obj.pk).values_list('student_id', 'date')
+        super().save_model(request, obj, form, change)
+        rollup.refresh(keys)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rollup.refresh([(obj.student_id, obj.date)])
+
+    def delete_queryset(self, request, queryset):
+        keys = list(queryset.values_list('student_id', 'date'))
+        super().delete_queryset(request, queryset)
+        rollup.refresh(keys)
+
+@admin.register(ArchivedAttendance)
+class ArchivedAttendanceAdmin(admin.ModelAdmin):
+    list_display = ("student", "date", "status", "timestamp")
+    list_filter = ("status",)
+    search_fields = ("student__name", "student__student_id")
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_students(queryset, search_term, fields=("name", "student_id"), prefix="student__"), False
+
+    # History is moved here by archive_attendance only; keep it read-only.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # Teacher management moved to custom view to avoid admin template issues
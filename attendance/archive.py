@@ -0,0 +1,153 @@
+"""Hot/cold split of attendance history.
+
+``manage.py archive_attendance`` moves whole months of old rows from ``Attendance``
+into ``ArchivedAttendance`` in chunked transactions, so the hot table (sign-in,
+the detailed log, the admin) only holds recent days. Readers that cover arbitrary
+ranges (exports, the report's partial months, the rollup rebuild) use
+:func:`attendance_sources` to pick up the archive when the range reaches into it.
+
+The monthly rollup keeps counting archived rows; archiving does not change it.
+
+On PostgreSQL the archive table can be turned into a declaratively partitioned
+table (one ``RANGE`` partition per year of ``date``) with
+:func:`partition_archive_table`; partitions are then created on demand while
+archiving and old years can be detached or dropped in one statement.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from .models import ArchivedAttendance, Attendance
+
+COLUMNS = ('id', 'student_id', 'date', 'status', 'timestamp', 'login_time')
+CHUNK_SIZE = 5000
+
+
+def archived_through():
+    """Latest archived date, or ``None`` when nothing has been archived."""
+    return ArchivedAttendance.objects.aggregate(last=Max('date'))['last']
+
+
+def attendance_sources(start=None):
+    """Models holding attendance rows dated ``start`` or later, archive first.
+
+    Archived months all precede the hot ones, so reading the sources in order and
+    each by date gives one date-ordered stream.
+    """
+    last = archived_through()
+    if last is not None and (start is None or start <= last):
+        return [ArchivedAttendance, Attendance]
+    return [Attendance]
+
+
+def archive_cutoff(before):
+    """Snap ``before`` down to the first of its month so months are never split."""
+    return before.replace(day=1)
+
+
+def archive_before(before, chunk_size=CHUNK_SIZE, progress=None):
+    """Move every ``Attendance`` row dated before the month containing ``before``.
+
+    Each chunk is copied with ``INSERT ... SELECT`` and deleted in its own
+    transaction, so the hot table is never locked for the whole run and an
+    interrupted run can simply be restarted. Returns the number of rows moved.
+    """
+    cutoff = archive_cutoff(before)
+    ops = connection.ops
+    q = ops.quote_name
+    hot = q(Attendance._meta.db_table)
+    cold = q(ArchivedAttendance._meta.db_table)
+    columns = ', '.join(q(c) for c in COLUMNS)
+    partitioned = is_partitioned()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            old = Attendance.objects.filter(date__lt=cutoff)
+            ids = list(old.order_by('id').values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            chunk = old.filter(id__lte=ids[-1])
+            if partitioned:
+                span = chunk.aggregate(first=Min('date'), last=Max('date'))
+                ensure_partitions(span['first'], span['last'])
+            where = f"WHERE {q('date')} < %s AND {q('id')} <= %s"
+            params = [ops.adapt_datefield_value(cutoff), ids[-1]]
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {cold} ({columns}) SELECT {columns} FROM {hot} {where}", params)
+                cursor.execute(f"DELETE FROM {hot} {where}", params)
+                moved += cursor.rowcount
+        if progress:
+            progress(moved)
+    return moved
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [ArchivedAttendance._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _partition_name(year):
+    return f"{ArchivedAttendance._meta.db_table}_y{year}"
+
+
+def ensure_partitions(first, last):
+    """Create the yearly partitions covering ``first``..``last`` if missing."""
+    q = connection.ops.quote_name
+    table = q(ArchivedAttendance._meta.db_table)
+    with connection.cursor() as cursor:
+        for year in range(first.year, last.year + 1):
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {q(_partition_name(year))} PARTITION OF {table} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [date(year, 1, 1), date(year + 1, 1, 1)],
+            )
+
+
+def partition_archive_table():
+    """Recreate the (empty) archive table as ``PARTITION BY RANGE (date)`` on PostgreSQL.
+
+    PostgreSQL requires the partition key in every unique constraint, so the primary
+    key becomes ``(id, date)``; Django still addresses rows by ``id`` alone. The other
+    constraint and index names are kept so later migrations still find them.
+    """
+    if connection.vendor != 'postgresql':
+        raise ValueError("Partitioning is only supported on PostgreSQL.")
+    if is_partitioned():
+        return False
+    if ArchivedAttendance.objects.exists():
+        raise ValueError("The archive table must be empty to be partitioned.")
+    q = connection.ops.quote_name
+    name = ArchivedAttendance._meta.db_table
+    table = q(name)
+    staging = q(f"{name}_partitioned")
+    student = q(ArchivedAttendance._meta.get_field('student').related_model._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, name)
+        statements = [
+            f"CREATE TABLE {staging} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({q('date')})",
+            f"DROP TABLE {table}",
+            f"ALTER TABLE {staging} RENAME TO {table}",
+        ]
+        for constraint, info in constraints.items():
+            columns = ', '.join(q(c) for c in info['columns'])
+            if info['primary_key']:
+                statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {q(constraint)} PRIMARY KEY ({columns}, {q('date')})")
+            elif info['unique']:
+                statements.append(f"ALTER TABLE {table} ADD CONSTRAINT {q(constraint)} UNIQUE ({columns})")
+            elif info['foreign_key']:
+                statements.append(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {q(constraint)} FOREIGN KEY ({columns}) "
+                    f"REFERENCES {student} ({q('id')}) DEFERRABLE INITIALLY DEFERRED"
+                )
+            elif info['index']:
+                statements.append(f"CREATE INDEX {q(constraint)} ON {table} ({columns})")
+        for statement in statements:
+            cursor.execute(statement)
+    return True
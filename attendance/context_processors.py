@@ -1,19 +1,14 @@
 def teacher_status(request):
-    """Return a verified `is_teacher` boolean and `teacher_name` if session matches a Teacher.
+    """Return `is_teacher` and `teacher_name` for the navigation bar.
 
-    This function avoids side-effects and imports the `Teacher` model lazily to prevent
-    circular import issues during template rendering.
+    Reads the `request.teacher` object resolved once per request by
+    `attendance.middleware.TeacherMiddleware`; staff users count as teachers.
     """
-    tid = request.session.get('teacher_id')
-    is_teacher = False
-    teacher_name = None
-    if tid:
-        try:
-            from .models import Teacher
-            t = Teacher.objects.filter(teacher_id=tid).only('name').first()
-            if t:
-                is_teacher = True
-                teacher_name = t.name
-        except Exception:
-            is_teacher = False
-    return {'is_teacher': is_teacher, 'teacher_name': teacher_name}
+    teacher = getattr(request, 'teacher', None)
+    user = getattr(request, 'user', None)
+    is_staff = bool(user is not None and user.is_staff)
+    if teacher:
+        return {'is_teacher': True, 'teacher_name': teacher.name}
+    if is_staff:
+        return {'is_teacher': True, 'teacher_name': user.get_username()}
+    return {'is_teacher': False, 'teacher_name': None}
@@ -0,0 +1,77 @@
+"""A version stamp for attendance data, used for HTTP validators and cache keys.
+
+Every write to attendance or the roster calls :func:`bump` (the rollup functions do
+it for all attendance write paths), which stores a fresh ``(token, unix_time)`` pair
+in the shared cache once the transaction commits. Readers derive ``ETag`` and
+``Last-Modified`` from :func:`current` and key cached fragments on the token, so a
+repeat view with no intervening write costs one cache lookup.
+
+A second stamp, the history version, only moves when a write reaches back into a
+week or month that has already ended (see :func:`bump_history`); trend results for
+closed periods are cached on it indefinitely.
+"""
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+DATA_VERSION_KEY = "attendance:data:version"
+HISTORY_VERSION_KEY = "attendance:history:version"
+
+
+def _new_stamp():
+    return uuid.uuid4().hex, time.time()
+
+
+def bump():
+    """Advance the stamp when the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(DATA_VERSION_KEY, _new_stamp(), None))
+
+
+def _get(key):
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, _new_stamp(), None)
+        stamp = cache.get(key)
+    return stamp
+
+
+def current():
+    """Return ``(token, modified_at)``; a missing stamp is recreated as "changed now"."""
+    return _get(DATA_VERSION_KEY)
+
+
+async def acurrent():
+    """:func:`current` for async views."""
+    stamp = await cache.aget(DATA_VERSION_KEY)
+    if stamp is None:
+        await cache.aadd(DATA_VERSION_KEY, _new_stamp(), None)
+        stamp = await cache.aget(DATA_VERSION_KEY)
+    return stamp
+
+
+def open_since(today=None):
+    """First day of the current week or month, whichever is later.
+
+    Anything dated before it lies in a week or a month that has ended.
+    """
+    today = today or timezone.localdate()
+    return max(today - timedelta(days=today.weekday()), today.replace(day=1))
+
+
+def bump_history(days=None):
+    """Advance the history stamp on commit if any of ``days`` (every write when
+    ``None``) falls before :func:`open_since`."""
+    if days is not None:
+        boundary = open_since()
+        if not any(day < boundary for day in days):
+            return
+    transaction.on_commit(lambda: cache.set(HISTORY_VERSION_KEY, _new_stamp(), None))
+
+
+def history():
+    """Return the history ``(token, modified_at)`` stamp."""
+    return _get(HISTORY_VERSION_KEY)
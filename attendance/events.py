@@ -0,0 +1,100 @@
+"""Append-only sign-in event feed behind the live dashboard.
+
+Every attendance row created by a kiosk scan, a kiosk batch or end-of-day
+finalization also appends a ``SignInEvent`` in the same transaction. The dashboard
+stream reads the feed in ``id`` order and a reconnecting browser resumes from its
+``Last-Event-ID``, so a dropped connection neither loses nor repeats events.
+
+IDs are assigned at insert but become visible at commit, so on PostgreSQL a later
+ID can be readable before an earlier one. :func:`events_after` stops at a gap in
+the IDs until the events behind it are ``COMMIT_GRACE`` old; a gap that never
+fills (a rolled-back insert) is passed over after that.
+"""
+from datetime import timedelta
+
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateformat import time_format
+
+from .models import SignInEvent
+
+COMMIT_GRACE = timedelta(seconds=2)
+BATCH_SIZE = 500
+RECENT_EVENTS = 50
+
+
+def record(rows):
+    """Append events for ``(student_pk, date, status, login_time)`` rows.
+
+    Call inside the transaction that inserted the attendance rows.
+    """
+    SignInEvent.objects.bulk_create(
+        [SignInEvent(student_id=pk, date=day, status=status, login_time=login_time)
+         for pk, day, status, login_time in rows],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def events_after(last_id, limit=BATCH_SIZE):
+    """Events after ``last_id`` in ID order, up to the first gap that may still fill.
+
+    Returns ``(events, waiting)``; ``waiting`` is true when more events are ready or
+    were held back, i.e. the caller should look again without waiting for a write.
+    """
+    rows = list(SignInEvent.objects.select_related('student').filter(id__gt=last_id).order_by('id')[:limit])
+    settled = timezone.now() - COMMIT_GRACE
+    events = []
+    expected = last_id + 1
+    for event in rows:
+        if event.id != expected and event.created_at > settled:
+            return events, True
+        events.append(event)
+        expected = event.id + 1
+    return events, len(rows) == limit
+
+
+def _settled_id():
+    """Highest ID whose predecessors have all had ``COMMIT_GRACE`` to commit."""
+    settled = timezone.now() - COMMIT_GRACE
+    recent = SignInEvent.objects.order_by('-id').values_list('id', 'created_at')
+    while True:
+        rows = list(recent[:BATCH_SIZE])
+        if not rows:
+            return 0
+        for pk, created_at in rows:
+            if created_at <= settled:
+                return pk
+        recent = recent.filter(id__lt=rows[-1][0])
+
+
+def dashboard_state(day):
+    """Counts by status, the latest events and the ID to stream from for ``day``.
+
+    Counts and rows are taken from the feed up to the same ID, so the stream picks up
+    exactly where they stop.
+    """
+    last_id = _settled_id()
+    events = SignInEvent.objects.filter(date=day, id__lte=last_id)
+    counts = dict.fromkeys(('present', 'late', 'absent'), 0)
+    counts.update(events.values_list('status').annotate(n=Count('id')).order_by())
+    recent = list(events.select_related('student').order_by('-id')[:RECENT_EVENTS])
+    return {'last_event_id': last_id, 'counts': counts, 'recent': recent}
+
+
+def as_json(event):
+    return {
+        'id': event.id,
+        'student_id': event.student.student_id,
+        'name': event.student.name,
+        'date': event.date.isoformat(),
+        'status': event.status,
+        'login_time': time_format(event.login_time, 'h:i A') if event.login_time else None,
+    }
+
+
+def prune(before):
+    """Delete events created before ``before``, always keeping the newest event so
+    IDs keep ascending (SQLite reuses the ID of a deleted last row)."""
+    newest = SignInEvent.objects.order_by('-id').values_list('id', flat=True).first()
+    deleted, _ = SignInEvent.objects.filter(created_at__lt=before).exclude(id=newest).delete()
+    return deleted
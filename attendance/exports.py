@@ -0,0 +1,155 @@
+"""Streaming attendance exports.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` so no model instances
+are built and the queryset result cache is never filled; on PostgreSQL Django backs
+``iterator()`` with a server-side cursor, so a worker only ever holds one chunk of rows
+in memory. Each format is a generator of text chunks that can be wrapped by
+:func:`gzip_stream` and handed to a ``StreamingHttpResponse``; under ASGI,
+:func:`async_chunks` pulls it one chunk at a time.
+"""
+import csv
+import heapq
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+
+from .absences import school_days
+from .archive import attendance_sources
+from .models import Student
+from .rollup import STATUSES
+
+EXPORT_COLUMNS = ['student_id', 'name', 'date', 'status', 'timestamp']
+CHUNK_SIZE = 2000
+# Rows are grouped before being yielded so the WSGI server is not handed one tiny
+# write per attendance record.
+ROWS_PER_WRITE = 500
+
+# Cell codes of the student x date matrix; a blank cell means no row for that day.
+MATRIX_CODES = {'present': 'P', 'late': 'L', 'absent': 'A'}
+MATRIX_DEFAULT_DAYS = 180
+MATRIX_MAX_DAYS = 400
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def attendance_rows(start=None, end=None):
+    # The archive only holds months before the hot table's, so it is read first.
+    for model in attendance_sources(start):
+        qs = model.objects.order_by('date', 'id')
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        rows = qs.values_list('student__student_id', 'student__name', 'date', 'status', 'timestamp')
+        for student_id, name, day, status, timestamp in rows.iterator(chunk_size=CHUNK_SIZE):
+            yield student_id, name, day.isoformat(), status, timestamp.isoformat()
+
+
+def _student_days(start, end):
+    """``(student_pk, date, status)`` for ``start``..``end`` in (student, date) order.
+
+    Each table is read in the order of its ``(student, date)`` unique index; the hot
+    and archive streams are merged so a student's archived and recent days arrive
+    together.
+    """
+    streams = []
+    for model in attendance_sources(start):
+        qs = model.objects.filter(date__gte=start, date__lte=end).order_by('student_id', 'date')
+        streams.append(qs.values_list('student_id', 'date', 'status').iterator(chunk_size=CHUNK_SIZE))
+    return heapq.merge(*streams, key=lambda row: (row[0], row[1]))
+
+
+def matrix(start, end, include_weekends=False):
+    """Roll-book grid for ``start``..``end``: ``(header, rows)``.
+
+    One row per student (in primary-key order) with a code from ``MATRIX_CODES`` per
+    school day and the status totals. Students and attendance are read as two
+    sorted streams and walked side by side, so memory holds one student's row at a
+    time however many students and days are exported.
+    """
+    days = list(school_days(start, end, include_weekends))
+    column = {day: i for i, day in enumerate(days)}
+    header = ['student_id', 'name', *(day.isoformat() for day in days), *STATUSES]
+
+    def rows():
+        attendance = _student_days(start, end)
+        pending = next(attendance, None)
+        students = Student.objects.order_by('pk').values_list('pk', 'student_id', 'name')
+        for pk, student_id, name in students.iterator(chunk_size=CHUNK_SIZE):
+            cells = [''] * len(days)
+            totals = dict.fromkeys(STATUSES, 0)
+            while pending is not None and pending[0] <= pk:
+                student_pk, day, status = pending
+                i = column.get(day)
+                # Rows on days without a column (weekends) are skipped.
+                if student_pk == pk and i is not None:
+                    cells[i] = MATRIX_CODES.get(status, '?')
+                    totals[status] = totals.get(status, 0) + 1
+                pending = next(attendance, None)
+            yield [student_id, name, *cells, *(totals[s] for s in STATUSES)]
+
+    return header, rows()
+
+
+def _batched(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= ROWS_PER_WRITE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+def csv_stream(rows, header=EXPORT_COLUMNS):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    yield from _batched(writer.writerow(row) for row in rows)
+
+
+def ndjson_stream(rows, columns=EXPORT_COLUMNS):
+    yield from _batched(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+
+
+def gzip_stream(chunks, encoding='utf-8'):
+    """Compress an iterable of text chunks into a gzip byte stream on the fly."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def async_chunks(chunks):
+    """Async iterator over a sync iterable of chunks.
+
+    Each chunk is produced through ``sync_to_async``, i.e. in the request's thread, so
+    a streaming query keeps using the same database connection throughout. Without
+    this Django's ASGI handler reads a sync iterator into a list before sending it.
+    """
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def export_stream(fmt, rows, compress=False):
+    """Return ``(chunks, content_type, filename_extension)`` for an export."""
+    content_type, extension = FORMATS[fmt]
+    chunks = csv_stream(rows) if fmt == 'csv' else ndjson_stream(rows)
+    if compress:
+        return gzip_stream(chunks), 'application/gzip', extension + '.gz'
+    return chunks, content_type, extension
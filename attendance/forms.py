@@ -4,11 +4,12 @@ from .models import Student
 class StudentForm(forms.ModelForm):
     class Meta:
         model = Student
-        fields = ['name', 'email', 'student_id']
+        fields = ['name', 'email', 'student_id', 'section']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'class': 'form-control'}),
             'student_id': forms.TextInput(attrs={'class': 'form-control'}),
+            'section': forms.Select(attrs={'class': 'form-select'}),
         }
 
 class AttendanceSignForm(forms.Form):
@@ -21,6 +22,8 @@ class AttendanceSignForm(forms.Form):
 
 class CSVUploadForm(forms.Form):
     csv_file = forms.FileField(label='CSV file', help_text='CSV with columns: name,student_id,email')
+    dry_run = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}), label='Dry run (preview changes without saving)')
+    background = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}), label='Run in the background (for large files)')
 
 
 class AttendanceFilterForm(forms.Form):
@@ -28,6 +31,32 @@ class AttendanceFilterForm(forms.Form):
     end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
 
 
+class AttendanceExportForm(AttendanceFilterForm):
+    format = forms.ChoiceField(required=False, choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')])
+    gzip = forms.BooleanField(required=False, label='Compress (gzip)')
+
+
+class AttendanceMatrixForm(AttendanceFilterForm):
+    include_weekends = forms.BooleanField(required=False, label='Include weekends')
+    gzip = forms.BooleanField(required=False, label='Compress (gzip)')
+
+
+class TrendsForm(AttendanceFilterForm):
+    period = forms.ChoiceField(required=False, choices=[('week', 'Weekly'), ('month', 'Monthly')],
+                               widget=forms.Select(attrs={'class': 'form-select'}))
+    student = forms.CharField(required=False, max_length=64, label='Student ID',
+                              widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'All students'}))
+
+    def clean_student(self):
+        student_id = self.cleaned_data['student'].strip()
+        if not student_id:
+            return None
+        try:
+            return Student.objects.get(student_id=student_id)
+        except Student.DoesNotExist:
+            raise forms.ValidationError('Student ID not found.')
+
+
 class TeacherSignForm(forms.Form):
     teacher_id = forms.CharField(max_length=64, widget=forms.TextInput(attrs={'class': 'form-control'}), label='Teacher ID')
     pin = forms.CharField(max_length=32, required=False, widget=forms.PasswordInput(attrs={'class': 'form-control'}), label='PIN (optional)')
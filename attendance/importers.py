@@ -0,0 +1,179 @@
+"""Chunked, bulk student roster import.
+
+The upload is decoded and parsed as a stream, ``CHUNK_SIZE`` rows at a time. Each
+chunk costs one ``SELECT`` for the student IDs it mentions plus at most one
+``bulk_create`` and one ``bulk_update`` (only rows whose name or email actually
+changed are rewritten). Every chunk commits in its own transaction, so a large roster
+never holds one long write lock. The whole file is checked to be valid UTF-8 before
+the first chunk is written, so a bad byte late in the file cannot leave the roster
+half imported.
+"""
+import codecs
+import csv
+import io
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from . import dataversion
+from .models import Student
+from .signin import invalidate_student_index
+
+CHUNK_SIZE = 1000
+# Cap on how many rows of each kind are kept for the diff shown to the user.
+MAX_DIFF_ROWS = 200
+
+NAME_COLUMNS = ('name', 'Name')
+ID_COLUMNS = ('student_id', 'studentId', 'student')
+EMAIL_COLUMNS = ('email', 'Email')
+
+
+class ImportResult:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.created_rows = []
+        self.updated_rows = []
+        self.rejected_rows = []
+
+    @property
+    def total(self):
+        return self.created + self.updated + self.unchanged + self.rejected
+
+    def summary(self):
+        prefix = 'Dry run' if self.dry_run else 'Import complete'
+        return (f'{prefix}: {self.created} created, {self.updated} updated, '
+                f'{self.unchanged} unchanged, {self.rejected} rejected.')
+
+    def _add(self, rows, item):
+        if len(rows) < MAX_DIFF_ROWS:
+            rows.append(item)
+
+    def reject(self, line, student_id, reason):
+        self.rejected += 1
+        self._add(self.rejected_rows, {'line': line, 'student_id': student_id, 'reason': reason})
+
+
+def _first(row, columns):
+    for column in columns:
+        value = row.get(column)
+        if value:
+            return value.strip()
+    return ''
+
+
+def _parse(line, row, seen, result):
+    student_id = _first(row, ID_COLUMNS)
+    name = _first(row, NAME_COLUMNS)
+    email = _first(row, EMAIL_COLUMNS)
+    if not student_id:
+        result.reject(line, '', 'Missing student ID.')
+    elif len(student_id) > Student._meta.get_field('student_id').max_length:
+        result.reject(line, student_id, 'Student ID is too long.')
+    elif len(name) > Student._meta.get_field('name').max_length:
+        result.reject(line, student_id, 'Name is too long.')
+    elif student_id in seen:
+        result.reject(line, student_id, 'Duplicate student ID in upload.')
+    else:
+        try:
+            if email:
+                validate_email(email)
+        except ValidationError:
+            result.reject(line, student_id, 'Invalid email address.')
+        else:
+            seen.add(student_id)
+            return student_id, name, email
+    return None
+
+
+def _apply_chunk(rows, result, dry_run):
+    existing = {
+        s.student_id: s
+        for s in Student.objects.filter(student_id__in=[r[0] for r in rows]).only('id', 'student_id', 'name', 'email')
+    }
+    to_create = []
+    to_update = []
+    for student_id, name, email in rows:
+        current = existing.get(student_id)
+        if current is None:
+            to_create.append(Student(student_id=student_id, name=name, email=email))
+            result._add(result.created_rows, {'student_id': student_id, 'name': name, 'email': email})
+            continue
+        changes = {}
+        if current.name != name:
+            changes['name'] = (current.name, name)
+        if current.email != email:
+            changes['email'] = (current.email, email)
+        if not changes:
+            result.unchanged += 1
+            continue
+        current.name = name
+        current.email = email
+        to_update.append(current)
+        result._add(result.updated_rows, {'student_id': student_id, 'changes': changes})
+    result.created += len(to_create)
+    result.updated += len(to_update)
+    if dry_run:
+        return
+    with transaction.atomic():
+        if to_create:
+            Student.objects.bulk_create(to_create)
+            # bulk_create sends no post_save, so refresh the sign-in index by hand.
+            invalidate_student_index()
+        if to_update:
+            Student.objects.bulk_update(to_update, ['name', 'email'])
+        if to_create or to_update:
+            dataversion.bump()
+
+
+def _is_utf8(fileobj, block_size=64 * 1024):
+    """Decode the whole of a seekable binary file without keeping it, then rewind."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    try:
+        while block := fileobj.read(block_size):
+            decoder.decode(block)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    finally:
+        fileobj.seek(0)
+    return True
+
+
+def import_students_csv(fileobj, dry_run=False, chunk_size=CHUNK_SIZE, progress=None):
+    """Import a ``name,student_id,email`` CSV from a seekable binary file object.
+
+    With ``dry_run`` nothing is written; the returned :class:`ImportResult` still
+    describes what would be created, updated, left unchanged or rejected.
+    ``progress``, if given, is called with the result so far after every chunk.
+    """
+    result = ImportResult(dry_run=dry_run)
+    if not _is_utf8(fileobj):
+        result.reject(None, '', 'File is not valid UTF-8; nothing was imported.')
+        return result
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(text)
+        seen = set()
+        chunk = []
+        for row in reader:
+            # line_num counts physical lines, so a quoted field spanning several
+            # lines does not shift the numbers of the rows after it.
+            parsed = _parse(reader.line_num, row, seen, result)
+            if parsed:
+                chunk.append(parsed)
+            if len(chunk) >= chunk_size:
+                _apply_chunk(chunk, result, dry_run)
+                chunk = []
+                if progress:
+                    progress(result)
+        if chunk:
+            _apply_chunk(chunk, result, dry_run)
+    finally:
+        # Leave the underlying upload open for its owner to close.
+        text.detach()
+    return result
@@ -0,0 +1,153 @@
+"""Database-backed background jobs.
+
+Views call :func:`submit` and return straight away with a link to the job's status
+page; ``manage.py run_jobs`` claims queued jobs one at a time and runs them. A claim
+is a conditional ``UPDATE ... WHERE status = 'queued'``, so any number of workers
+can poll the same table without running a job twice. Uploaded input and produced
+files are kept under ``settings.JOB_RESULTS_DIR/<job id>/`` until :func:`prune`
+removes the job, ``settings.JOB_RETENTION_DAYS`` after it finished.
+"""
+import os
+import shutil
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import exports, rollup
+from .importers import import_students_csv
+from .models import Job
+
+# Minimum seconds between progress writes to the job row.
+PROGRESS_INTERVAL = 2.0
+# A running job without a heartbeat for this long is handed to another worker.
+STALE_AFTER = timedelta(minutes=10)
+INPUT_NAME = 'input.csv'
+
+
+def job_dir(job):
+    return os.path.join(settings.JOB_RESULTS_DIR, str(job.pk))
+
+
+def submit(kind, params=None, created_by='', upload=None):
+    """Queue a job; ``upload`` (an uploaded file) is saved as the job's input."""
+    with transaction.atomic():
+        job = Job.objects.create(kind=kind, params=params or {}, created_by=created_by)
+        if upload is not None:
+            os.makedirs(job_dir(job), exist_ok=True)
+            with open(os.path.join(job_dir(job), INPUT_NAME), 'wb') as f:
+                for chunk in upload.chunks():
+                    f.write(chunk)
+    return job
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return it, or ``None``."""
+    while True:
+        pk = Job.objects.filter(status='queued').order_by('id').values_list('id', flat=True).first()
+        if pk is None:
+            return None
+        now = timezone.now()
+        if Job.objects.filter(pk=pk, status='queued').update(status='running', started_at=now, heartbeat_at=now):
+            return Job.objects.get(pk=pk)
+        # Another worker claimed it first; try the next one.
+
+
+def requeue_stale():
+    """Put running jobs whose worker stopped reporting back in the queue."""
+    return Job.objects.filter(status='running', heartbeat_at__lt=timezone.now() - STALE_AFTER).update(
+        status='queued', started_at=None,
+    )
+
+
+def prune(before):
+    """Delete jobs that finished before ``before``, with their input and result files."""
+    pks = list(Job.objects.filter(status__in=('done', 'failed'), finished_at__lt=before).values_list('id', flat=True))
+    for pk in pks:
+        shutil.rmtree(os.path.join(settings.JOB_RESULTS_DIR, str(pk)), ignore_errors=True)
+    deleted, _ = Job.objects.filter(pk__in=pks).delete()
+    return deleted
+
+
+class Progress:
+    """Callable that records a job's progress, at most every ``PROGRESS_INTERVAL`` seconds."""
+
+    def __init__(self, job):
+        self.job = job
+        self.last = 0.0
+
+    def __call__(self, count, force=False):
+        now = time.monotonic()
+        if force or now - self.last >= PROGRESS_INTERVAL:
+            self.last = now
+            Job.objects.filter(pk=self.job.pk).update(progress=count, heartbeat_at=timezone.now())
+
+
+def _run_import(job, progress):
+    path = os.path.join(job_dir(job), INPUT_NAME)
+    with open(path, 'rb') as f:
+        result = import_students_csv(f, dry_run=job.params.get('dry_run', False),
+                                     progress=lambda r: progress(r.total))
+    progress(result.total, force=True)
+    lines = [result.summary()]
+    lines += [f"line {r['line']}: {r['student_id'] or '-'}: {r['reason']}" for r in result.rejected_rows]
+    return {'summary': '\n'.join(lines)}
+
+
+def _run_export(job, progress):
+    params = job.params
+    start = parse_date(params.get('start') or '')
+    end = parse_date(params.get('end') or '')
+    fmt = params.get('format') or 'csv'
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            if count % exports.CHUNK_SIZE == 0:
+                progress(count)
+            yield row
+
+    chunks, content_type, extension = exports.export_stream(
+        fmt, counted(exports.attendance_rows(start, end)), params.get('gzip', False),
+    )
+    name = f"attendance_export.{extension}"
+    os.makedirs(job_dir(job), exist_ok=True)
+    with open(os.path.join(job_dir(job), name), 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    progress(count, force=True)
+    return {
+        'summary': f"Exported {count} rows.",
+        'result_file': os.path.join(str(job.pk), name),
+        'result_name': name,
+        'content_type': content_type,
+    }
+
+
+def _run_rebuild(job, progress):
+    written = rollup.rebuild(progress=progress)
+    progress(written, force=True)
+    return {'summary': f"Rollup rebuilt: {written} student-month rows."}
+
+
+HANDLERS = {
+    'import_students': _run_import,
+    'export_attendance': _run_export,
+    'rebuild_rollup': _run_rebuild,
+}
+
+
+def run(job):
+    """Run a claimed job to completion, recording its outcome on the row."""
+    try:
+        outcome = HANDLERS[job.kind](job, Progress(job))
+    except Exception as e:
+        Job.objects.filter(pk=job.pk).update(status='failed', error=f"{type(e).__name__}: {e}",
+                                             finished_at=timezone.now())
+        raise
+    Job.objects.filter(pk=job.pk).update(status='done', finished_at=timezone.now(), **outcome)
@@ -0,0 +1,78 @@
+"""Logging building blocks referenced from ``settings.LOGGING``.
+
+Nothing here imports models: this module is loaded while Django configures logging,
+before the app registry is ready.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+# LogRecord attributes that are not user-supplied ``extra`` fields.
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message plus any ``extra`` fields."""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass a random ``rate`` share of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """Hand records to a background thread that does the actual stream I/O.
+
+    Records are formatted on the calling thread (so ``extra`` values are captured) and
+    written to stderr by a ``QueueListener``. The queue is bounded: when the writer
+    falls behind, records are dropped rather than blocking a request.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.dropped = 0
+        super().__init__(queue.Queue(maxsize))
+        self._start()
+
+    def _start(self):
+        self._pid = os.getpid()
+        self.listener = logging.handlers.QueueListener(self.queue, logging.StreamHandler(sys.stderr))
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record):
+        if os.getpid() != self._pid:
+            # Forked (e.g. gunicorn --preload): the listener thread did not survive,
+            # and records queued before the fork belong to the parent.
+            self.queue = queue.Queue(self.maxsize)
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
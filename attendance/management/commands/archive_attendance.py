@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance import archive
+from attendance.models import Attendance
+
+
+class Command(BaseCommand):
+    help = ("Move whole months of old attendance into the archive table in chunked "
+            "transactions. Exports and reports keep reading archived rows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Archive months before the one containing this date, YYYY-MM-DD.")
+        parser.add_argument('--older-than-days', type=int,
+                            help="Archive months older than this many days "
+                                 "(default ATTENDANCE_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument('--chunk-size', type=int, default=archive.CHUNK_SIZE,
+                            help=f"Rows moved per transaction (default {archive.CHUNK_SIZE}).")
+        parser.add_argument('--partition', action='store_true',
+                            help="PostgreSQL only: first convert the empty archive table into one "
+                                 "range-partitioned by date, one partition per year.")
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many rows would move.")
+
+    def handle(self, *args, **options):
+        if options['before'] and options['older_than_days'] is not None:
+            raise CommandError("Use either --before or --older-than-days, not both.")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date {options['before']!r}; use YYYY-MM-DD.")
+        else:
+            days = options['older_than_days']
+            if days is None:
+                days = settings.ATTENDANCE_ARCHIVE_AFTER_DAYS
+            before = timezone.localdate() - timedelta(days=days)
+        cutoff = archive.archive_cutoff(before)
+        # Sign-ins only check for archived days outside the current month.
+        if cutoff > timezone.localdate().replace(day=1):
+            raise CommandError("The current month cannot be archived.")
+
+        if options['partition'] and not options['dry_run']:
+            try:
+                if archive.partition_archive_table():
+                    self.stdout.write("Archive table is now partitioned by date.")
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        if options['dry_run']:
+            count = Attendance.objects.filter(date__lt=cutoff).count()
+            self.stdout.write(f"{count} rows dated before {cutoff} would be archived.")
+            return
+
+        moved = archive.archive_before(
+            cutoff, options['chunk_size'],
+            progress=lambda n: self.stdout.write(f"  {n} rows moved") if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} rows dated before {cutoff}."))
@@ -0,0 +1,183 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from attendance.models import Attendance, Job, Student
+from attendance.urls import urlpatterns
+
+BENCHMARK_USER = '__benchmark__'
+# Views that would change the benchmark session itself, queue background work, or
+# never finish.
+SKIPPED_VIEWS = {'teacher_sign_out', 'export_attendance_job', 'rebuild_rollup_job', 'job_download', 'sign_in_stream'}
+# Requests that record attendance, only sent with --scratch.
+WRITING_REQUESTS = {('sign_in', 'post'), ('kiosk_scans', 'post')}
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = ("Hit every view in attendance/urls.py through the test client and record latency "
+            "percentiles, SQL query counts and peak memory to a JSON file. The benchmark user and "
+            "job it creates are removed afterwards; sign-ins and kiosk scans are only sent with "
+            "--scratch, since those are kept.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per view (default 20).")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per view first (default 2).")
+        parser.add_argument('--output', default='benchmark.json', help="Where to write results (default benchmark.json).")
+        parser.add_argument('--compare', help="Earlier results file to print a comparison against.")
+        parser.add_argument('--views', nargs='*', help="Only benchmark these URL names.")
+        parser.add_argument('--scratch', action='store_true',
+                            help="Also benchmark sign-ins and kiosk scans, which write attendance. "
+                                 "Only use against a scratch database.")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        student_ids = list(Student.objects.values_list('student_id', flat=True)[:1000]) or ['__missing__']
+        user, created_user = get_user_model().objects.get_or_create(username=BENCHMARK_USER, defaults={'is_staff': True})
+        if not user.is_staff:
+            raise CommandError(f"User {BENCHMARK_USER!r} exists but is not staff.")
+        staff = Client()
+        staff.force_login(user)
+        anonymous = Client()
+        rnd = random.Random(0)
+        job = Job.objects.create(kind='rebuild_rollup', status='done', created_by=BENCHMARK_USER)
+
+        def kiosk_batch():
+            now = timezone.now().isoformat()
+            return json.dumps({'scans': [
+                {'idempotency_key': uuid.uuid4().hex, 'student_id': rnd.choice(student_ids), 'scanned_at': now}
+                for _ in range(20)
+            ]})
+
+        # name -> (client, method, url kwargs, request factory); unknown views get a staff GET.
+        specs = {
+            'sign_in': [(anonymous, 'get', None, None),
+                        (anonymous, 'post', None, lambda: {'data': {'student_id': rnd.choice(student_ids)}})],
+            'home': [(anonymous, 'get', None, None)],
+            'teacher_sign_in': [(anonymous, 'get', None, None)],
+            'kiosk_scans': [(anonymous, 'post', None,
+                             lambda: {'data': kiosk_batch(), 'content_type': 'application/json'})],
+            'delete_teacher': [(staff, 'get', {'teacher_id': BENCHMARK_USER}, None)],
+            'job_status': [(staff, 'get', {'job_id': job.pk}, None)],
+        }
+
+        results = {}
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for pattern in urlpatterns:
+                    name = pattern.name
+                    if not name or name in SKIPPED_VIEWS or (options['views'] and name not in options['views']):
+                        continue
+                    for client, method, kwargs, factory in specs.get(name, [(staff, 'get', None, None)]):
+                        if (name, method) in WRITING_REQUESTS and not options['scratch']:
+                            continue
+                        label = name if method == 'get' else f'{name} [{method.upper()}]'
+                        url = reverse(f'attendance:{name}', kwargs=kwargs)
+                        results[label] = self._measure(client, method, url, factory, options)
+                        self.stdout.write(f"{label:40s} p50={results[label]['latency_ms']['p50']:8.2f} ms  "
+                                          f"queries={results[label]['queries']['max']:4d}")
+        finally:
+            staff.logout()
+            job.delete()
+            if created_user:
+                user.delete()
+
+        report = {
+            'meta': {
+                'commit': self._git_commit(),
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'students': Student.objects.count(),
+                'attendance_rows': Attendance.objects.count(),
+                'iterations': options['iterations'],
+            },
+            'views': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        if options['compare']:
+            self._compare(options['compare'], report)
+
+    def _request(self, client, method, url, factory):
+        response = getattr(client, method)(url, **(factory() if factory else {}))
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        response.close()
+        return response.status_code, size
+
+    def _measure(self, client, method, url, factory, options):
+        for _ in range(options['warmup']):
+            self._request(client, method, url, factory)
+        latencies = []
+        query_counts = []
+        status = size = None
+        for _ in range(options['iterations']):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                status, size = self._request(client, method, url, factory)
+                latencies.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(queries))
+        # Memory is traced in a separate request so tracemalloc does not skew latency.
+        tracemalloc.start()
+        try:
+            self._request(client, method, url, factory)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return {
+            'url': url,
+            'status': status,
+            'response_bytes': size,
+            'latency_ms': dict(
+                {f'p{p}': round(_percentile(latencies, p), 3) for p in PERCENTILES},
+                mean=round(statistics.fmean(latencies), 3),
+                max=round(max(latencies), 3),
+            ),
+            'queries': {'min': min(query_counts), 'max': max(query_counts)},
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _compare(self, path, report):
+        with open(path) as f:
+            previous = json.load(f)
+        self.stdout.write(f"\nCompared with {path} (commit {previous['meta'].get('commit')}):")
+        for label, now in report['views'].items():
+            before = previous['views'].get(label)
+            if not before:
+                continue
+            old, new = before['latency_ms']['p50'], now['latency_ms']['p50']
+            change = (new - old) / old * 100 if old else 0.0
+            self.stdout.write(
+                f"{label:40s} p50 {old:8.2f} -> {new:8.2f} ms ({change:+6.1f}%)  "
+                f"queries {before['queries']['max']} -> {now['queries']['max']}  "
+                f"peak {before['peak_memory_kb']} -> {now['peak_memory_kb']} KB"
+            )
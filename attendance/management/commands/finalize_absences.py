@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings as django_settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.absences import finalize_day, is_day_closed, school_days
+from attendance.archive import archived_through
+from attendance.events import prune
+from attendance.schedules import load
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = ("Record students with no attendance row on a day as absent. Safe to re-run and to "
+            "schedule from cron after the late cutoff; days already finalized insert nothing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to finalize, YYYY-MM-DD (default today).")
+        parser.add_argument('--start', help="First day of a range to finalize, YYYY-MM-DD.")
+        parser.add_argument('--end', help="Last day of the range, YYYY-MM-DD (default today).")
+        parser.add_argument('--include-weekends', action='store_true',
+                            help="Also finalize Saturdays and Sundays (skipped by default).")
+
+    def handle(self, *args, **options):
+        if options['date'] and (options['start'] or options['end']):
+            raise CommandError("Use either --date or --start/--end, not both.")
+        today = timezone.localdate()
+        if options['start'] or options['end']:
+            start = _date(options['start']) if options['start'] else today
+            end = _date(options['end']) if options['end'] else today
+        else:
+            start = end = _date(options['date']) if options['date'] else today
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        archived = archived_through()
+        if archived is not None and start <= archived:
+            raise CommandError(f"Days up to {archived} are archived and cannot be finalized.")
+
+        lookup = load()
+        # An absent row would turn a later scan into a duplicate, so open days are refused.
+        if not is_day_closed(end, lookup):
+            closes_at = lookup.closing_time(end.weekday())
+            if closes_at is None:
+                raise CommandError(f"{end} is open for sign-in until midnight (a late cutoff wraps past it); "
+                                   f"finalize it tomorrow with --date {end}.")
+            raise CommandError(f"{end} is still open for sign-in; run after {closes_at:%H:%M}.")
+
+        total = 0
+        days = 0
+        for day in school_days(start, end, options['include_weekends']):
+            inserted = finalize_day(day)
+            total += inserted
+            days += 1
+            if options['verbosity'] > 1 or start == end:
+                self.stdout.write(f"{day}: {inserted} absent rows added.")
+        self.stdout.write(self.style.SUCCESS(f"Finalized {days} day(s): {total} absent rows added."))
+
+        pruned = prune(timezone.now() - timedelta(days=django_settings.SIGN_IN_EVENT_RETENTION_DAYS))
+        if pruned:
+            self.stdout.write(f"Deleted {pruned} sign-in events older than "
+                              f"{django_settings.SIGN_IN_EVENT_RETENTION_DAYS} days.")
@@ -0,0 +1,95 @@
+import random
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from attendance import rollup
+from attendance.models import Attendance, ClassSettings, Student
+from attendance.signin import invalidate_student_index
+
+BATCH_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = ("Generate synthetic students and school days of attendance with bulk inserts, "
+            "for reproducing production-scale load locally.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100, help="Number of students (default 100).")
+        parser.add_argument('--days', type=int, default=20, help="Number of school days, Mon-Fri (default 20).")
+        parser.add_argument('--end-date', help="Last school day to generate, YYYY-MM-DD (default today).")
+        parser.add_argument('--late-rate', type=float, default=0.10, help="Share of scans that are late.")
+        parser.add_argument('--absent-rate', type=float, default=0.05,
+                            help="Share of scans after the late threshold (recorded as absent).")
+        parser.add_argument('--no-show-rate', type=float, default=0.03,
+                            help="Share of student-days with no attendance row at all.")
+        parser.add_argument('--prefix', default='SYN', help="Prefix for generated student IDs (default SYN).")
+        parser.add_argument('--seed', type=int, help="Random seed for reproducible data.")
+
+    def handle(self, *args, **options):
+        if options['students'] < 1 or options['days'] < 1:
+            raise CommandError("--students and --days must be at least 1.")
+        if options['late_rate'] + options['absent_rate'] + options['no_show_rate'] > 1:
+            raise CommandError("late, absent and no-show rates must add up to at most 1.")
+        end = (datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+               if options['end_date'] else timezone.localdate())
+        rnd = random.Random(options['seed'])
+        days = []
+        day = end
+        while len(days) < options['days']:
+            if day.weekday() < 5:
+                days.append(day)
+            day -= timedelta(days=1)
+        days.reverse()
+
+        prefix = options['prefix']
+        width = len(str(options['students']))
+        Student.objects.bulk_create(
+            [Student(name=f"Student {prefix}{i:0{width}d}", student_id=f"{prefix}{i:0{width}d}")
+             for i in range(options['students'])],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        invalidate_student_index()
+        student_pks = list(Student.objects.filter(student_id__startswith=prefix).values_list('pk', flat=True))
+
+        settings = ClassSettings.get_settings()
+        start = datetime.combine(end, settings.class_start_time)
+        cutoff = start + timedelta(minutes=settings.late_threshold_minutes)
+        late_rate = options['late_rate']
+        absent_rate = late_rate + options['absent_rate']
+        no_show_rate = absent_rate + options['no_show_rate']
+
+        def login_time():
+            roll = rnd.random()
+            if roll < late_rate:
+                return 'late', (start + timedelta(seconds=1) + (cutoff - start - timedelta(seconds=1)) * rnd.random()).time()
+            if roll < absent_rate:
+                return 'absent', (cutoff + timedelta(minutes=rnd.uniform(1, 90))).time()
+            if roll < no_show_rate:
+                return None, None
+            return 'present', (start - timedelta(minutes=rnd.uniform(0, 25))).time()
+
+        written = 0
+        batch = []
+        with transaction.atomic():
+            for day in days:
+                for pk in student_pks:
+                    status, at = login_time()
+                    if status is None:
+                        continue
+                    batch.append(Attendance(student_id=pk, date=day, status=status, login_time=at))
+                    if len(batch) >= BATCH_SIZE:
+                        Attendance.objects.bulk_create(batch, ignore_conflicts=True)
+                        written += len(batch)
+                        batch = []
+            if batch:
+                Attendance.objects.bulk_create(batch, ignore_conflicts=True)
+                written += len(batch)
+            rollup.refresh_months(days)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(student_pks)} students and up to {written} attendance rows "
+            f"over {len(days)} school days ({days[0]} to {days[-1]})."
+        ))
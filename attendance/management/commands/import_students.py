@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from attendance.importers import import_students_csv
+
+
+class Command(BaseCommand):
+    help = "Import or update students from a CSV file with columns name,student_id,email."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without writing.")
+
+    def handle(self, *args, **options):
+        with open(options['csv_path'], 'rb') as f:
+            result = import_students_csv(f, dry_run=options['dry_run'])
+        for row in result.rejected_rows:
+            self.stderr.write(f"line {row['line']}: {row['student_id'] or '-'}: {row['reason']}")
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,156 @@
+import http.client
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from attendance.models import Student
+
+SERVERS = {
+    'wsgi': ['attendance_project.wsgi:application'],
+    'asgi': ['attendance_project.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ("Start the app under gunicorn with sync (WSGI) workers and with uvicorn (ASGI) "
+            "workers in turn, drive the same number of concurrent kiosk clients at each and "
+            "compare throughput and latency. Signs students in, so use a scratch database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='*', choices=sorted(SERVERS), default=sorted(SERVERS, reverse=True))
+        parser.add_argument('--workers', type=int, default=2, help="Server worker processes (default 2).")
+        parser.add_argument('--concurrency', type=int, default=32, help="Concurrent clients (default 32).")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per server (default 10).")
+        parser.add_argument('--method', choices=['get', 'post'], default='post',
+                            help="GET the sign-in page or POST sign-ins (default post).")
+
+    def handle(self, *args, **options):
+        student_ids = list(Student.objects.values_list('student_id', flat=True)[:5000])
+        if options['method'] == 'post' and not student_ids:
+            raise CommandError("No students; run generate_attendance_data first.")
+        results = {}
+        for name in options['servers']:
+            port = _free_port()
+            server = self._start(name, port, options['workers'])
+            try:
+                self._wait_ready(port)
+                results[name] = self._drive(port, student_ids, options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            r = results[name]
+            self.stdout.write(
+                f"{name}: {r['requests']} requests in {r['seconds']:.1f}s = {r['rps']:.0f} req/s, "
+                f"p50={r['p50']:.1f} ms p99={r['p99']:.1f} ms, errors={r['errors']}"
+            )
+            for error, n in r['error_kinds'].most_common(3):
+                self.stdout.write(f"    {n} x {error}")
+        if 'wsgi' in results and 'asgi' in results and results['wsgi']['rps']:
+            self.stdout.write(self.style.SUCCESS(
+                f"ASGI/WSGI throughput ratio: {results['asgi']['rps'] / results['wsgi']['rps']:.2f}"
+            ))
+
+    def _start(self, name, port, workers):
+        cmd = [sys.executable, '-m', 'gunicorn', *SERVERS[name], '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--log-level', 'warning']
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'attendance_project.settings'),
+                   ALLOWED_HOSTS='127.0.0.1,localhost', LOG_SQL='off', REQUEST_LOG_SAMPLE_RATE='0')
+        try:
+            return subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env)
+        except OSError as e:
+            raise CommandError(f"Could not start {name} server: {e}")
+
+    def _wait_ready(self, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+                conn.request('GET', reverse('attendance:sign_in'))
+                conn.getresponse().read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server on port {port} did not start within {timeout}s.")
+
+    def _drive(self, port, student_ids, options):
+        url = reverse('attendance:sign_in')
+        latencies = []
+        errors = Counter()
+        lock = threading.Lock()
+        stop_at = time.monotonic() + options['duration']
+
+        def client(n):
+            rnd = random.Random(n)
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            cookie = token = None
+            local = []
+            while time.monotonic() < stop_at:
+                started = time.perf_counter()
+                try:
+                    if options['method'] == 'get' or token is None:
+                        conn.request('GET', url)
+                        response = conn.getresponse()
+                        body = response.read().decode()
+                        match = CSRF_INPUT.search(body)
+                        set_cookie = response.getheader('Set-Cookie') or ''
+                        if match and 'csrftoken=' in set_cookie:
+                            token = match.group(1)
+                            cookie = set_cookie.split(';', 1)[0]
+                        if options['method'] == 'post':
+                            continue
+                    else:
+                        body = urlencode({'csrfmiddlewaretoken': token, 'student_id': rnd.choice(student_ids)})
+                        conn.request('POST', url, body, {
+                            'Content-Type': 'application/x-www-form-urlencoded', 'Cookie': cookie,
+                            'Referer': f'http://127.0.0.1:{port}{url}',
+                        })
+                        response = conn.getresponse()
+                        response.read()
+                    if response.status >= 400:
+                        raise http.client.HTTPException(f"HTTP {response.status}")
+                    local.append((time.perf_counter() - started) * 1000)
+                except (OSError, http.client.HTTPException) as e:
+                    with lock:
+                        errors[f"{type(e).__name__}: {e}"] += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.monotonic() - started
+        ordered = sorted(latencies) or [0.0]
+        return {
+            'requests': len(latencies),
+            'seconds': seconds,
+            'rps': len(latencies) / seconds,
+            'p50': statistics.median(ordered),
+            'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            'errors': sum(errors.values()),
+            'error_kinds': errors,
+        }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from attendance import rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute the monthly attendance rollup table from the Attendance rows."
+
+    def handle(self, *args, **options):
+        written = rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rollup rebuilt: {written} student-month rows."))
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.models import ClassSettings
+from attendance.reclassify import describe, reclassify
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Recompute attendance statuses from stored login times with the current class settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day to reclassify, YYYY-MM-DD (default: all).")
+        parser.add_argument('--end', help="Last day to reclassify, YYYY-MM-DD (default: all).")
+
+    def handle(self, *args, **options):
+        start = _date(options['start']) if options['start'] else None
+        end = _date(options['end']) if options['end'] else None
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end.")
+        counts = reclassify(ClassSettings.get_settings(), start, end)
+        self.stdout.write(self.style.SUCCESS(describe(counts)))
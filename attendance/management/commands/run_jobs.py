@@ -0,0 +1,51 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from attendance import jobs
+
+# Seconds between sweeps for jobs past JOB_RETENTION_DAYS.
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, exports, rollup rebuilds). Start one or more per host."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty.")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds between polls of an empty queue (default 2).")
+
+    def handle(self, *args, **options):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+        last_prune = None
+        while True:
+            close_old_connections()
+            job = jobs.claim_next()
+            if job is None:
+                if last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL:
+                    self.prune()
+                    last_prune = time.monotonic()
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                jobs.requeue_stale()
+                continue
+            label = f"{job.get_kind_display()} #{job.pk}"
+            self.stdout.write(f"Running {label}")
+            try:
+                jobs.run(job)
+            except Exception as e:
+                self.stderr.write(f"{label} failed: {type(e).__name__}: {e}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"Finished {label}"))
+
+    def prune(self):
+        pruned = jobs.prune(timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS))
+        if pruned:
+            self.stdout.write(f"Deleted {pruned} job(s) finished more than {settings.JOB_RETENTION_DAYS} days ago.")
@@ -0,0 +1,91 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+from django.core import signing
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from attendance.models import Student
+from attendance.views import SIGN_IN_RESULT_SALT
+
+
+class Command(BaseCommand):
+    help = ("Post student sign-ins from many threads at once and report failures such as "
+            "'database is locked'. It records attendance for today, so run it against a "
+            "scratch database (e.g. after generate_attendance_data).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help="Concurrent clients (default 16).")
+        parser.add_argument('--scans', type=int, default=50, help="Sign-ins per thread (default 50).")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for picking students.")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['scans'] < 1:
+            raise CommandError("--threads and --scans must be at least 1.")
+        student_ids = list(Student.objects.values_list('student_id', flat=True))
+        if not student_ids:
+            raise CommandError("No students; run generate_attendance_data first.")
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                self.stdout.write(f"SQLite journal_mode={cursor.fetchone()[0]}")
+        url = reverse('attendance:sign_in')
+        outcomes = Counter()
+        errors = Counter()
+        latencies = []
+        lock = threading.Lock()
+        start_line = threading.Barrier(options['threads'])
+
+        def worker(n):
+            rnd = random.Random(options['seed'] + n)
+            client = Client(raise_request_exception=True)
+            start_line.wait()
+            try:
+                for _ in range(options['scans']):
+                    started = time.perf_counter()
+                    try:
+                        response = client.post(url, {'student_id': rnd.choice(student_ids)})
+                        token = parse_qs(urlparse(response['Location']).query)['result'][0]
+                        outcome = signing.loads(token, salt=SIGN_IN_RESULT_SALT)
+                    except Exception as e:
+                        outcome = None
+                        error = f"{type(e).__name__}: {e}"
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        if outcome is None:
+                            errors[error] += 1
+                        else:
+                            outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        started = time.perf_counter()
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - started
+
+        total = options['threads'] * options['scans']
+        ordered = sorted(latencies)
+        self.stdout.write(
+            f"{total} sign-ins from {options['threads']} threads in {wall:.2f}s "
+            f"({total / wall:.0f}/s); p50={statistics.median(ordered):.1f} ms "
+            f"max={ordered[-1]:.1f} ms"
+        )
+        for outcome, n in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome:10s} {n}")
+        if errors:
+            for error, n in errors.most_common():
+                self.stderr.write(f"  {n} x {error}")
+            raise CommandError(f"{sum(errors.values())} of {total} sign-ins failed.")
+        self.stdout.write(self.style.SUCCESS("No failed sign-ins."))
@@ -0,0 +1,287 @@
+"""Low-overhead per-view request metrics in Prometheus text format.
+
+Each worker process accumulates counters in memory (a dict update under a lock per
+request) and at most every ``FLUSH_INTERVAL`` seconds writes a snapshot to its own file
+in ``settings.METRICS_DIR``. The ``/metrics`` view sums every worker's file, so the
+numbers cover all gunicorn workers on the host without any cross-process locking on
+the request path. Files left by workers that have exited are deleted at the next
+scrape, so the totals drop back as Prometheus would see after any counter reset.
+"""
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+# Request latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+FLUSH_INTERVAL = 5.0
+SIGN_IN_OUTCOMES = ('present', 'late', 'absent', 'duplicate', 'unknown', 'archived')
+
+request_logger = logging.getLogger('attendance.request')
+query_logger = logging.getLogger('attendance.db')
+
+_lock = threading.Lock()
+_views = {}
+_sign_ins = dict.fromkeys(SIGN_IN_OUTCOMES, 0)
+_last_flush = 0.0
+# QueryTimer of the request being handled. A context variable follows the request
+# into the threads sync_to_async runs its queries in, under WSGI and ASGI alike.
+_query_timer = ContextVar('attendance_query_timer', default=None)
+# Unique per process so a recycled PID never overwrites a dead worker's totals.
+_process_file = f"metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(tempfile.gettempdir(), 'attendance_metrics')
+
+
+def _new_view_stats():
+    return {
+        'buckets': [0] * len(LATENCY_BUCKETS),
+        'count': 0,
+        'duration': 0.0,
+        'queries': 0,
+        'db_time': 0.0,
+        'response_bytes': 0,
+        'status': {},
+    }
+
+
+def record_request(view, duration, queries, db_time, response_bytes, status_code):
+    status = f"{status_code // 100}xx"
+    with _lock:
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = _new_view_stats()
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                stats['buckets'][i] += 1
+                break
+        stats['count'] += 1
+        stats['duration'] += duration
+        stats['queries'] += queries
+        stats['db_time'] += db_time
+        stats['response_bytes'] += response_bytes
+        stats['status'][status] = stats['status'].get(status, 0) + 1
+    maybe_flush()
+
+
+def record_sign_in(outcome):
+    with _lock:
+        _sign_ins[outcome] = _sign_ins.get(outcome, 0) + 1
+
+
+def maybe_flush(force=False):
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    with _lock:
+        snapshot = json.dumps({'views': _views, 'sign_ins': _sign_ins})
+    directory = metrics_dir()
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, _process_file)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp, path)
+    except OSError:
+        # Metrics must never break a request.
+        pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user.
+        return True
+    return True
+
+
+def _prune(directory, names):
+    """Delete snapshots (and stray ``.tmp`` files) of processes that have exited;
+    return the names still live."""
+    live = []
+    for name in names:
+        try:
+            pid = int(name.split('-')[1])
+        except (IndexError, ValueError):
+            continue
+        if pid == os.getpid() or _pid_alive(pid):
+            live.append(name)
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+    return live
+
+
+def collect():
+    """Sum the snapshots written by every live worker process."""
+    maybe_flush(force=True)
+    views = {}
+    sign_ins = dict.fromkeys(SIGN_IN_OUTCOMES, 0)
+    directory = metrics_dir()
+    try:
+        names = _prune(directory, [n for n in os.listdir(directory) if n.startswith('metrics-')])
+    except OSError:
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for view, stats in data.get('views', {}).items():
+            total = views.setdefault(view, _new_view_stats())
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+            for key in ('count', 'duration', 'queries', 'db_time', 'response_bytes'):
+                total[key] += stats[key]
+            for status, n in stats['status'].items():
+                total['status'][status] = total['status'].get(status, 0) + n
+        for outcome, n in data.get('sign_ins', {}).items():
+            sign_ins[outcome] = sign_ins.get(outcome, 0) + n
+    return views, sign_ins
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_prometheus():
+    views, sign_ins = collect()
+    lines = [
+        '# HELP attendance_request_duration_seconds Request latency by view.',
+        '# TYPE attendance_request_duration_seconds histogram',
+    ]
+    for view, stats in sorted(views.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS, stats['buckets']):
+            cumulative += n
+            le = '+Inf' if bound == math.inf else repr(bound)
+            lines.append(f'attendance_request_duration_seconds_bucket{{view="{_label(view)}",le="{le}"}} {cumulative}')
+        lines.append(f'attendance_request_duration_seconds_sum{{view="{_label(view)}"}} {stats["duration"]}')
+        lines.append(f'attendance_request_duration_seconds_count{{view="{_label(view)}"}} {stats["count"]}')
+    counters = [
+        ('attendance_requests_total', 'Requests by view and status class.', None),
+        ('attendance_db_queries_total', 'Database queries run by view.', 'queries'),
+        ('attendance_db_time_seconds_total', 'Time spent in database queries by view.', 'db_time'),
+        ('attendance_response_bytes_total', 'Response body bytes by view (non-streaming responses).', 'response_bytes'),
+    ]
+    for metric, help_text, key in counters:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} counter')
+        for view, stats in sorted(views.items()):
+            if key is None:
+                for status, n in sorted(stats['status'].items()):
+                    lines.append(f'{metric}{{view="{_label(view)}",status="{status}"}} {n}')
+            else:
+                lines.append(f'{metric}{{view="{_label(view)}"}} {stats[key]}')
+    lines.append('# HELP attendance_sign_ins_total Student sign-in outcomes.')
+    lines.append('# TYPE attendance_sign_ins_total counter')
+    for outcome, n in sorted(sign_ins.items()):
+        lines.append(f'attendance_sign_ins_total{{outcome="{_label(outcome)}"}} {n}')
+    return '\n'.join(lines) + '\n'
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` callable that counts queries and their time, and
+    logs any query slower than ``slow_query_ms`` to the ``attendance.db`` logger."""
+
+    def __init__(self, slow_query_ms=None):
+        self.count = 0
+        self.time = 0.0
+        self.slow = slow_query_ms / 1000 if slow_query_ms else None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.time += elapsed
+            if self.slow is not None and elapsed >= self.slow:
+                query_logger.info('slow query', extra={'duration_ms': round(elapsed * 1000, 2), 'sql': sql})
+
+
+def time_queries(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection (see ``attendance.signals``) that
+    hands each query to the current request's :class:`QueryTimer`, if there is one."""
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+@sync_and_async_middleware
+class MetricsMiddleware:
+    """Record latency, DB queries/time and response size per URL name.
+
+    Also emits the one-line ``attendance.request`` log (sampled by ``settings.LOGGING``)
+    and, with ``settings.LOG_SQL == 'slow'``, the slow-query log.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_query_ms = settings.SLOW_QUERY_MS if getattr(settings, 'LOG_SQL', None) == 'slow' else None
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timer = QueryTimer(self.slow_query_ms)
+        token = _query_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        self._record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timer = QueryTimer(self.slow_query_ms)
+        token = _query_timer.set(timer)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_timer.reset(token)
+        self._record(request, response, timer, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, timer, duration):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        size = 0 if response.streaming else len(response.content)
+        record_request(view, duration, timer.count, timer.time, size, response.status_code)
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info('request', extra={
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'queries': timer.count,
+                'db_ms': round(timer.time * 1000, 2),
+                'bytes': size,
+            })
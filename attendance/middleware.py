@@ -0,0 +1,69 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject
+
+# How long a session's teacher ID is trusted before it is checked against the
+# database again. Deleting a teacher through the app clears the entry immediately.
+TEACHER_CACHE_TTL = 60
+
+
+class CurrentTeacher:
+    """The signed-in teacher as resolved from the session."""
+
+    def __init__(self, teacher_id, name):
+        self.teacher_id = teacher_id
+        self.name = name
+
+    def __str__(self):
+        return f"{self.name} ({self.teacher_id})"
+
+
+def _cache_key(teacher_id):
+    return f"attendance:teacher:{teacher_id}"
+
+
+def forget_teacher(teacher_id):
+    cache.delete(_cache_key(teacher_id))
+
+
+def resolve_teacher(request):
+    """Return a :class:`CurrentTeacher` for the session's teacher ID, or ``None``."""
+    teacher_id = request.session.get('teacher_id')
+    if not teacher_id:
+        return None
+    key = _cache_key(teacher_id)
+    name = cache.get(key)
+    if name is None:
+        from .models import Teacher
+        # Unknown IDs are cached as '' so a stale session cannot force a query per request.
+        name = Teacher.objects.filter(teacher_id=teacher_id).values_list('name', flat=True).first() or ''
+        cache.set(key, name, TEACHER_CACHE_TTL)
+    if not name:
+        return None
+    return CurrentTeacher(teacher_id, name)
+
+
+@sync_and_async_middleware
+class TeacherMiddleware:
+    """Attach a lazily resolved ``request.teacher`` (falsy when nobody is signed in).
+
+    The lookup runs at most once per request, and not at all on requests that never
+    look at it, so kiosk sign-ins pay nothing for it. Under ASGI the middleware runs
+    on the event loop, so it adds no thread switch of its own.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.teacher = SimpleLazyObject(lambda: resolve_teacher(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.teacher = SimpleLazyObject(lambda: resolve_teacher(request))
+        return await self.get_response(request)
@@ -0,0 +1,46 @@
+# Generated by Django 4.2 on 2026-10-18 18:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+
+def populate_rollup(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    MonthlyAttendanceSummary = apps.get_model('attendance', 'MonthlyAttendanceSummary')
+    rows = (
+        Attendance.objects.annotate(month=TruncMonth('date'))
+        .values('student_id', 'month')
+        .annotate(**{s: Count('id', filter=Q(status=s)) for s in ('present', 'late', 'absent')})
+        .order_by()
+    )
+    MonthlyAttendanceSummary.objects.bulk_create(
+        (MonthlyAttendanceSummary(**row) for row in rows), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_classsettings_attendance_login_time_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='attendance.student')),
+            ],
+            options={
+                'verbose_name_plural': 'Monthly attendance summaries',
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2 on 2026-10-18 18:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_monthlyattendancesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KioskScan',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=128, unique=True)),
+                ('student_id', models.CharField(max_length=64)),
+                ('scanned_at', models.DateTimeField()),
+                ('result', models.CharField(choices=[('present', 'Present'), ('late', 'Late'), ('absent', 'Absent'), ('duplicate', 'Already signed in'), ('unknown', 'Unknown student ID')], max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
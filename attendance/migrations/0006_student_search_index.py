@@ -0,0 +1,87 @@
+# Adds the (date, status) attendance indexes and a full-text index over student
+# name, ID and email: an FTS5 trigram table kept in sync by triggers on SQLite, or
+# pg_trgm GIN indexes on PostgreSQL. Other backends search without an index.
+
+from django.db import migrations, models, transaction
+from django.db.utils import DatabaseError
+
+SEARCH_COLUMNS = ('name', 'student_id', 'email')
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE attendance_student_fts USING fts5("
+    "name, student_id, email, content='attendance_student', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER attendance_student_fts_ai AFTER INSERT ON attendance_student BEGIN "
+    "INSERT INTO attendance_student_fts(rowid, name, student_id, email) "
+    "VALUES (new.id, new.name, new.student_id, new.email); END",
+    "CREATE TRIGGER attendance_student_fts_ad AFTER DELETE ON attendance_student BEGIN "
+    "INSERT INTO attendance_student_fts(attendance_student_fts, rowid, name, student_id, email) "
+    "VALUES ('delete', old.id, old.name, old.student_id, old.email); END",
+    "CREATE TRIGGER attendance_student_fts_au AFTER UPDATE ON attendance_student BEGIN "
+    "INSERT INTO attendance_student_fts(attendance_student_fts, rowid, name, student_id, email) "
+    "VALUES ('delete', old.id, old.name, old.student_id, old.email); "
+    "INSERT INTO attendance_student_fts(rowid, name, student_id, email) "
+    "VALUES (new.id, new.name, new.student_id, new.email); END",
+    "INSERT INTO attendance_student_fts(attendance_student_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS attendance_student_fts_ai",
+    "DROP TRIGGER IF EXISTS attendance_student_fts_ad",
+    "DROP TRIGGER IF EXISTS attendance_student_fts_au",
+    "DROP TABLE IF EXISTS attendance_student_fts",
+]
+
+POSTGRES_CREATE = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS attendance_student_{column}_trgm "
+    f"ON attendance_student USING gin (UPPER({column}::text) gin_trgm_ops)"
+    for column in SEARCH_COLUMNS
+]
+
+POSTGRES_DROP = [f"DROP INDEX IF EXISTS attendance_student_{column}_trgm" for column in SEARCH_COLUMNS]
+
+
+def _run(schema_editor, statements):
+    # Without FTS5/trigram support (or permission to create pg_trgm) search keeps
+    # working through icontains, so a missing extension must not fail the migration.
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            with schema_editor.connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+    except DatabaseError:
+        pass
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_DROP)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_kioskscan'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['status', 'date'], name='attendance_status_date_idx'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
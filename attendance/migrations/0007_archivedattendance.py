@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 19:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_student_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('late', 'Late'), ('absent', 'Absent')], max_length=20)),
+                ('timestamp', models.DateTimeField()),
+                ('login_time', models.TimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendances', to='attendance.student')),
+            ],
+            options={
+                'verbose_name_plural': 'Archived attendance',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedattendance',
+            index=models.Index(fields=['date', 'status'], name='archived_date_status_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivedattendance',
+            unique_together={('student', 'date')},
+        ),
+    ]
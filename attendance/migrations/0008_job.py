@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_archivedattendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('import_students', 'Student import'), ('export_attendance', 'Attendance export'), ('rebuild_rollup', 'Report totals rebuild')], max_length=32)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('progress', models.PositiveIntegerField(default=0, help_text='Rows processed so far')),
+                ('summary', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('result_file', models.CharField(blank=True, help_text='Path relative to JOB_RESULTS_DIR', max_length=255)),
+                ('result_name', models.CharField(blank=True, help_text='Download file name', max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('created_by', models.CharField(blank=True, max_length=150)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ),
+    ]
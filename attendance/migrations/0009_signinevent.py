@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-18 19:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignInEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('present', 'Present'), ('late', 'Late'), ('absent', 'Absent')], max_length=20)),
+                ('login_time', models.TimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sign_in_events', to='attendance.student')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='signinevent',
+            index=models.Index(fields=['date', 'id'], name='sign_in_event_date_idx'),
+        ),
+    ]
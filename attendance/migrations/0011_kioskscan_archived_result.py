@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_section_schedule'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kioskscan',
+            name='result',
+            field=models.CharField(choices=[('present', 'Present'), ('late', 'Late'), ('absent', 'Absent'), ('duplicate', 'Already signed in'), ('unknown', 'Unknown student ID'), ('archived', 'Day already archived')], max_length=20),
+        ),
+    ]
@@ -1,11 +1,81 @@
-from django.db import models
+import uuid
+
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils import timezone
-from datetime import time
+from datetime import date, datetime, time, timedelta
+
+CLASS_SETTINGS_VERSION_KEY = "attendance:class_settings:version"
+# (version, ClassSettings) last loaded by this worker process; see ClassSettings.get_cached().
+_class_settings_cache = (None, None)
+
+def classify_login(login_time, class_start_time, late_cutoff):
+    """Return the attendance status for a local wall-clock login time."""
+    if login_time <= class_start_time:
+        return 'present'
+    # A cutoff that wrapped past midnight leaves the rest of the day as late.
+    if login_time <= late_cutoff or late_cutoff < class_start_time:
+        return 'late'
+    return 'absent'
+
+
+class ClassTimes(models.Model):
+    """Start time and late threshold shared by the school default and section schedules."""
+    class_start_time = models.TimeField(default=time(8, 0), help_text="Class start time (8:00 AM by default)")
+    late_threshold_minutes = models.IntegerField(default=30, help_text="Minutes after start time to mark as late (default: 30 min)")
+
+    class Meta:
+        abstract = True
+
+    def late_cutoff(self):
+        """Latest login time (inclusive) that still counts as late rather than absent."""
+        start = datetime.combine(date.min, self.class_start_time)
+        return (start + timedelta(minutes=self.late_threshold_minutes)).time()
+
+    def classify(self, login_time):
+        """Return the attendance status for a local wall-clock login time."""
+        return classify_login(login_time, self.class_start_time, self.late_cutoff())
+
+
+class Section(models.Model):
+    """A group of students sharing a weekly timetable (see ``Schedule``)."""
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Schedule(ClassTimes):
+    """A section's start time and late threshold on one weekday.
+
+    Days without a schedule, and students without a section, use ``ClassSettings``.
+    """
+    WEEKDAY_CHOICES = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name="schedules")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+
+    class Meta:
+        unique_together = ("section", "weekday")
+        ordering = ("section", "weekday")
+
+    def __str__(self):
+        return f"{self.section} - {self.get_weekday_display()} {self.class_start_time:%H:%M}"
+
 
 class Student(models.Model):
     name = models.CharField(max_length=200)
     email = models.EmailField(blank=True)
     student_id = models.CharField(max_length=64, unique=True)
+    section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True, related_name="students")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -25,11 +95,98 @@ class Attendance(models.Model):
 
     class Meta:
         unique_together = ("student", "date")
+        indexes = [
+            models.Index(fields=["date", "status"], name="attendance_date_status_idx"),
+            models.Index(fields=["status", "date"], name="attendance_status_date_idx"),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.date} - {self.status}"
 
 
+class ArchivedAttendance(models.Model):
+    """Attendance rows moved out of the hot table by ``manage.py archive_attendance``.
+
+    Same columns as ``Attendance`` and the original primary key. Whole months are
+    archived at a time, so a month's rows live in exactly one of the two tables.
+    """
+    id = models.IntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="archived_attendances")
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Attendance.STATUS_CHOICES)
+    timestamp = models.DateTimeField()
+    login_time = models.TimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("student", "date")
+        indexes = [
+            models.Index(fields=["date", "status"], name="archived_date_status_idx"),
+        ]
+        verbose_name_plural = "Archived attendance"
+
+    def __str__(self):
+        return f"{self.student} - {self.date} - {self.status}"
+
+
+class MonthlyAttendanceSummary(models.Model):
+    """Per-student attendance counters for one calendar month.
+
+    Maintained incrementally by the attendance write paths (see ``attendance.rollup``)
+    so reports do not have to scan every ``Attendance`` row in the requested range.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="monthly_summaries")
+    month = models.DateField(help_text="First day of the month")
+    present = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("student", "month")
+        verbose_name_plural = "Monthly attendance summaries"
+
+    def __str__(self):
+        return f"{self.student} - {self.month:%Y-%m}"
+
+
+class SignInEvent(models.Model):
+    """Append-only feed of recorded attendance rows for the live dashboard.
+
+    Written in the same transaction as the ``Attendance`` row it describes (see
+    ``attendance.events``); the ascending ``id`` is the server-sent-events ID.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="sign_in_events")
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Attendance.STATUS_CHOICES)
+    login_time = models.TimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["date", "id"], name="sign_in_event_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.student_id} - {self.date} - {self.status}"
+
+
+class KioskScan(models.Model):
+    """One scan submitted through the kiosk batch API, keyed by the client's
+    idempotency key so replayed batches return the original outcome."""
+    RESULT_CHOICES = Attendance.STATUS_CHOICES + [
+        ("duplicate", "Already signed in"),
+        ("unknown", "Unknown student ID"),
+        ("archived", "Day already archived"),
+    ]
+    idempotency_key = models.CharField(max_length=128, unique=True)
+    student_id = models.CharField(max_length=64)
+    scanned_at = models.DateTimeField()
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.idempotency_key} - {self.student_id} - {self.result}"
+
+
 class Teacher(models.Model):
     name = models.CharField(max_length=200)
     teacher_id = models.CharField(max_length=64, unique=True)
@@ -40,9 +197,8 @@ class Teacher(models.Model):
         return f"{self.name} ({self.teacher_id})"
 
 
-class ClassSettings(models.Model):
-    class_start_time = models.TimeField(default=time(8, 0), help_text="Class start time (8:00 AM by default)")
-    late_threshold_minutes = models.IntegerField(default=30, help_text="Minutes after start time to mark as late (default: 30 min)")
+class ClassSettings(ClassTimes):
+    """School-wide default start time and late threshold (a single row)."""
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,7 +208,83 @@ class ClassSettings(models.Model):
     def __str__(self):
         return f"Class Start: {self.class_start_time.strftime('%I:%M %p')}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(ClassSettings.bump_version)
+
     @staticmethod
     def get_settings():
         obj, created = ClassSettings.objects.get_or_create(id=1)
         return obj
+
+    @staticmethod
+    def bump_version():
+        """Tell every worker to reload its cached settings and schedule lookup
+        (``attendance.schedules``) on its next request."""
+        cache.set(CLASS_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+
+    @staticmethod
+    def get_cached():
+        """Return the settings from this worker's memory, reloading only when the
+        version stamp in the shared cache has moved. Treat the result as read-only.
+        """
+        global _class_settings_cache
+        version = cache.get(CLASS_SETTINGS_VERSION_KEY)
+        cached_version, obj = _class_settings_cache
+        if version is not None and version == cached_version:
+            return obj
+        if version is None:
+            cache.add(CLASS_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(CLASS_SETTINGS_VERSION_KEY)
+        # The version is read before loading, so a concurrent save can only make
+        # this copy look older than it is, never newer.
+        obj = ClassSettings.get_settings()
+        _class_settings_cache = (version, obj)
+        return obj
+
+
+class Job(models.Model):
+    """A long-running import, export or rebuild executed by ``manage.py run_jobs``.
+
+    Input uploads and results live on disk under ``settings.JOB_RESULTS_DIR``; see
+    ``attendance.jobs``.
+    """
+    KIND_CHOICES = [
+        ("import_students", "Student import"),
+        ("export_attendance", "Attendance export"),
+        ("rebuild_rollup", "Report totals rebuild"),
+    ]
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="queued")
+    params = models.JSONField(default=dict, blank=True)
+    progress = models.PositiveIntegerField(default=0, help_text="Rows processed so far")
+    summary = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    result_file = models.CharField(max_length=255, blank=True, help_text="Path relative to JOB_RESULTS_DIR")
+    result_name = models.CharField(max_length=255, blank=True, help_text="Download file name")
+    content_type = models.CharField(max_length=100, blank=True)
+    created_by = models.CharField(max_length=150, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Bumped with every progress report; a running job that stops updating is
+    # assumed to belong to a dead worker.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
@@ -0,0 +1,85 @@
+"""Recompute stored attendance statuses after ``ClassSettings`` or schedules change.
+
+``Attendance.login_time`` is kept for every scan, so a new start time or late
+threshold can be applied to past days with ``UPDATE ... SET status = CASE ...``
+over ``login_time`` and the weekday of ``date``: one statement per section with
+schedules and one for every other student, using the same rules as
+``attendance.schedules``. Rows without a login time (finalized absences, manual
+entries) and archived rows are left alone.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from django.db.models.functions import TruncMonth
+
+from . import rollup
+from .models import Attendance, Schedule
+from .schedules import Lookup
+
+
+def status_case(rule):
+    """SQL expression equivalent to ``rule.classify(login_time)`` for a
+    :class:`attendance.schedules.Rule`."""
+    cutoff = rule.late_cutoff
+    whens = [When(login_time__lte=rule.class_start_time, then=Value('present'))]
+    if cutoff < rule.class_start_time:
+        # The cutoff wrapped past midnight: the rest of the day counts as late.
+        return Case(*whens, default=Value('late'))
+    whens.append(When(login_time__lte=cutoff, then=Value('late')))
+    return Case(*whens, default=Value('absent'))
+
+
+def section_case(default, weekdays):
+    """Status expression for one section: its ``{weekday: rule}`` by the weekday of
+    ``date``, and ``default`` on the other days."""
+    if not weekdays:
+        return status_case(default)
+    return Case(
+        *[When(date__iso_week_day=weekday + 1, then=status_case(rule)) for weekday, rule in sorted(weekdays.items())],
+        default=status_case(default),
+    )
+
+
+def reclassify(settings, start=None, end=None):
+    """Apply ``settings`` and the section schedules to the stored rows dated
+    ``start``..``end`` (inclusive, open ended when ``None``).
+
+    Returns ``{(old_status, new_status): count}`` for the rows that changed.
+    """
+    lookup = Lookup(settings, Schedule.objects.all())
+    rows = Attendance.objects.filter(login_time__isnull=False)
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    sections = lookup.by_section()
+    groups = [
+        (rows.filter(student__section_id=section_id), section_case(lookup.default, weekdays))
+        for section_id, weekdays in sections.items()
+    ]
+    groups.append((rows.exclude(student__section_id__in=list(sections)), status_case(lookup.default)))
+
+    with transaction.atomic():
+        counts = {}
+        months = set()
+        for group, new_status in groups:
+            changed = group.exclude(status=new_status)
+            found = False
+            for row in (changed.annotate(new_status=new_status, month=TruncMonth('date'))
+                        .values('status', 'new_status', 'month').annotate(n=Count('id')).order_by()):
+                key = (row['status'], row['new_status'])
+                counts[key] = counts.get(key, 0) + row['n']
+                months.add(row['month'])
+                found = True
+            if found:
+                changed.update(status=new_status)
+        if months:
+            rollup.refresh_months(months)
+    return counts
+
+
+def describe(counts):
+    """Human-readable summary of a :func:`reclassify` result."""
+    if not counts:
+        return "No attendance statuses changed."
+    parts = [f"{n} {old} → {new}" for (old, new), n in sorted(counts.items())]
+    return f"Reclassified {sum(counts.values())} rows: " + ", ".join(parts) + "."
@@ -0,0 +1,225 @@
+"""Incrementally maintained monthly attendance counters.
+
+``MonthlyAttendanceSummary`` holds one row per (student, month) with a counter per
+status. Every code path that writes ``Attendance`` must keep it in step, inside the
+same transaction as the write:
+
+* single inserts call :func:`record`, which bumps one counter;
+* bulk or ad-hoc edits call :func:`refresh` with the affected (student, month) keys,
+  which recomputes just those rows from ``Attendance``;
+* ``manage.py rebuild_attendance_rollup`` calls :func:`rebuild` to start over.
+
+Each of these also bumps the data version (``attendance.dataversion``) that report
+and export caching is keyed on, and the history version when the write is dated in
+a week or month that has already ended.
+
+Reports read through :func:`summarize`, which takes whole months from the rollup and
+only touches ``Attendance`` for the partial months at either end of a date range.
+Recomputations read ``ArchivedAttendance`` too (see ``attendance.archive``), so
+archiving old rows never changes the counters.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from . import dataversion
+from .archive import attendance_sources
+from .models import MonthlyAttendanceSummary
+
+STATUSES = ('present', 'late', 'absent')
+BATCH_SIZE = 1000
+
+
+def month_start(d):
+    return d.replace(day=1)
+
+
+def next_month(d):
+    return (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _status_counts():
+    return {s: Count('id', filter=Q(status=s)) for s in STATUSES}
+
+
+def record(student_id, day, status, delta=1):
+    """Add ``delta`` to one student's counter for the month containing ``day``."""
+    month = month_start(day)
+    dataversion.bump()
+    dataversion.bump_history([day])
+    updated = MonthlyAttendanceSummary.objects.filter(student_id=student_id, month=month).update(
+        **{status: F(status) + delta}
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            MonthlyAttendanceSummary.objects.create(student_id=student_id, month=month, **{status: max(delta, 0)})
+    except IntegrityError:
+        # Another writer created the row first; fall back to the increment.
+        MonthlyAttendanceSummary.objects.filter(student_id=student_id, month=month).update(
+            **{status: F(status) + delta}
+        )
+
+
+def refresh(keys):
+    """Recompute the rollup rows for an iterable of ``(student_id, day)`` pairs.
+
+    ``day`` may be any date inside the month; rows are recomputed from ``Attendance``
+    with one aggregate query per month touched.
+    """
+    by_month = {}
+    earliest = None
+    for student_id, day in keys:
+        by_month.setdefault(month_start(day), set()).add(student_id)
+        earliest = day if earliest is None else min(earliest, day)
+    if by_month:
+        dataversion.bump()
+        dataversion.bump_history([earliest])
+    for month, student_ids in by_month.items():
+        ids = sorted(student_ids)
+        for i in range(0, len(ids), BATCH_SIZE):
+            _refresh_month(month, ids[i:i + BATCH_SIZE])
+
+
+def refresh_months(months):
+    """Recompute every student's rollup row for each month in ``months``."""
+    months = sorted({month_start(m) for m in months})
+    dataversion.bump()
+    dataversion.bump_history(months)
+    for month in months:
+        _recompute_month(month)
+
+
+def _recompute_month(month):
+    MonthlyAttendanceSummary.objects.filter(month=month).delete()
+    # A month is either archived or hot as a whole, never split across both.
+    return sum(
+        _insert_aggregates(model.objects.filter(date__gte=month, date__lt=next_month(month)))
+        for model in attendance_sources(month)
+    )
+
+
+def _refresh_month(month, student_ids):
+    with transaction.atomic():
+        # Make sure every row exists and lock them before counting: a concurrent
+        # record() then either committed first (and is counted) or waits and adds
+        # its increment on top of the recomputed value, instead of being overwritten.
+        MonthlyAttendanceSummary.objects.bulk_create(
+            [MonthlyAttendanceSummary(student_id=pk, month=month) for pk in student_ids], ignore_conflicts=True
+        )
+        list(MonthlyAttendanceSummary.objects.select_for_update()
+             .filter(month=month, student_id__in=student_ids).order_by('pk').values_list('pk', flat=True))
+        counts = {
+            row['student']: row
+            for model in attendance_sources(month)
+            for row in model.objects.filter(
+                student_id__in=student_ids, date__gte=month, date__lt=next_month(month)
+            ).values('student').annotate(**_status_counts())
+        }
+        rows = []
+        for student_id in student_ids:
+            c = counts.get(student_id, {})
+            rows.append(MonthlyAttendanceSummary(
+                student_id=student_id, month=month, **{s: c.get(s, 0) for s in STATUSES}
+            ))
+        MonthlyAttendanceSummary.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['student', 'month'], update_fields=list(STATUSES)
+        )
+
+
+def _insert_aggregates(queryset):
+    rows = (
+        queryset.annotate(month=TruncMonth('date'))
+        .values('student_id', 'month')
+        .annotate(**_status_counts())
+        .order_by()
+    )
+    batch = []
+    created = 0
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(MonthlyAttendanceSummary(**row))
+        if len(batch) >= BATCH_SIZE:
+            MonthlyAttendanceSummary.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        MonthlyAttendanceSummary.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def rebuild(progress=None):
+    """Drop and recompute the whole rollup. Returns the number of rows written.
+
+    Each month is recomputed in its own transaction, after which
+    ``progress(rows_written)`` is called if given.
+    """
+    months = set()
+    for model in attendance_sources():
+        months.update(model.objects.annotate(month=TruncMonth('date'))
+                      .values_list('month', flat=True).distinct().order_by())
+    with transaction.atomic():
+        dataversion.bump()
+        dataversion.bump_history()
+        MonthlyAttendanceSummary.objects.exclude(month__in=months).delete()
+    written = 0
+    for month in sorted(months):
+        with transaction.atomic():
+            dataversion.bump()
+            dataversion.bump_history([month])
+            written += _recompute_month(month)
+        if progress is not None:
+            progress(written)
+    return written
+
+
+def summarize(start=None, end=None):
+    """Return ``{student_pk: {'present': n, 'late': n, 'absent': n}}`` for a date range.
+
+    Months lying completely inside ``[start, end]`` come from the rollup; the partial
+    months at either edge are counted directly from ``Attendance``.
+    """
+    # [lo, hi) is the span of whole months covered by the range.
+    lo = start if start is None or start.day == 1 else next_month(start)
+    if end is None:
+        hi = None
+    else:
+        hi = next_month(end) if (end + timedelta(days=1)).day == 1 else month_start(end)
+
+    totals = {}
+
+    def add(student_id, status, n):
+        if n:
+            counts = totals.setdefault(student_id, dict.fromkeys(STATUSES, 0))
+            counts[status] += n
+
+    edges = []
+    if lo is not None and hi is not None and lo >= hi:
+        # The range does not cover a single whole month.
+        edges.append(Q(date__gte=start, date__lte=end))
+    else:
+        rollup = MonthlyAttendanceSummary.objects.all()
+        if lo is not None:
+            rollup = rollup.filter(month__gte=lo)
+        if hi is not None:
+            rollup = rollup.filter(month__lt=hi)
+        for row in rollup.values('student').annotate(**{s: Sum(s) for s in STATUSES}).order_by():
+            for s in STATUSES:
+                add(row['student'], s, row[s])
+        if start is not None and start != lo:
+            edges.append(Q(date__gte=start, date__lt=lo))
+        if end is not None and end != hi - timedelta(days=1):
+            edges.append(Q(date__gte=hi, date__lte=end))
+
+    if edges:
+        edge_filter = edges[0]
+        for q in edges[1:]:
+            edge_filter |= q
+        for model in attendance_sources(start):
+            rows = model.objects.filter(edge_filter).values('student', 'status').annotate(n=Count('id')).order_by()
+            for row in rows:
+                add(row['student'], row['status'], row['n'])
+    return totals
@@ -0,0 +1,96 @@
+"""Per-section classification rules.
+
+A student's scan is classified by the ``Schedule`` of their section for the scan's
+weekday, falling back to the school-wide ``ClassSettings``. Each worker keeps a
+:class:`Lookup` of every rule with its late cutoff already computed, keyed on
+``(section_id, weekday)``, so classifying a scan is a dict lookup and two time
+comparisons. The lookup is reloaded when ``ClassSettings.bump_version`` moves the
+stamp in the shared cache, which happens whenever the settings, a section or a
+schedule is saved or deleted.
+
+:func:`attendance.reclassify.reclassify` applies the same rules in SQL.
+"""
+import uuid
+from typing import NamedTuple
+
+from django.core.cache import cache
+
+from .models import CLASS_SETTINGS_VERSION_KEY, ClassSettings, Schedule, classify_login
+
+
+class Rule(NamedTuple):
+    class_start_time: object
+    late_cutoff: object
+    late_threshold_minutes: int
+
+    @classmethod
+    def of(cls, times):
+        """Rule for a ``ClassSettings`` or ``Schedule``."""
+        return cls(times.class_start_time, times.late_cutoff(), times.late_threshold_minutes)
+
+    def classify(self, login_time):
+        return classify_login(login_time, self.class_start_time, self.late_cutoff)
+
+    @property
+    def closes_at(self):
+        """Time after which a scan is absent, or ``None`` when the cutoff wraps past
+        midnight and the rest of the day counts as late."""
+        return None if self.late_cutoff < self.class_start_time else self.late_cutoff
+
+
+class Lookup:
+    """Every section's rule per weekday plus the school default."""
+
+    def __init__(self, settings, schedules):
+        self.default = Rule.of(settings)
+        self.rules = {(s.section_id, s.weekday): Rule.of(s) for s in schedules}
+
+    def rule(self, section_id, weekday):
+        return self.rules.get((section_id, weekday), self.default)
+
+    def classify(self, section_id, local_datetime):
+        """Status of a scan at ``local_datetime`` by a student in ``section_id``."""
+        return self.rule(section_id, local_datetime.weekday()).classify(local_datetime.time())
+
+    def rules_on(self, weekday):
+        """The default and every section rule that applies on ``weekday``."""
+        return [self.default] + [rule for (_, day), rule in self.rules.items() if day == weekday]
+
+    def closing_time(self, weekday):
+        """Latest :attr:`Rule.closes_at` on ``weekday``; ``None`` when any rule stays
+        open until the end of the day."""
+        times = [rule.closes_at for rule in self.rules_on(weekday)]
+        return None if None in times else max(times)
+
+    def by_section(self):
+        """``{section_id: {weekday: rule}}`` for the sections that have schedules."""
+        sections = {}
+        for (section_id, weekday), rule in self.rules.items():
+            sections.setdefault(section_id, {})[weekday] = rule
+        return sections
+
+
+def load():
+    """Build a :class:`Lookup` from the database."""
+    return Lookup(ClassSettings.get_settings(), Schedule.objects.all())
+
+
+# (version, Lookup) last loaded by this worker process.
+_lookup = (None, None)
+
+
+def get_lookup():
+    """Return this worker's :class:`Lookup`, reloading it only when the version stamp
+    in the shared cache has moved. Treat the result as read-only."""
+    global _lookup
+    version = cache.get(CLASS_SETTINGS_VERSION_KEY)
+    cached_version, lookup = _lookup
+    if version is not None and version == cached_version:
+        return lookup
+    if version is None:
+        cache.add(CLASS_SETTINGS_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CLASS_SETTINGS_VERSION_KEY)
+    # Read before loading, as in ClassSettings.get_cached().
+    lookup = load()
+    _lookup = (version, lookup)
+    return lookup
@@ -0,0 +1,58 @@
+"""Indexed student search shared by the views and the admin.
+
+Substring search with ``icontains`` cannot use a B-tree index because of the leading
+wildcard. Migration 0006 builds a real index instead:
+
+* SQLite: an FTS5 table ``attendance_student_fts`` with the trigram tokenizer, kept
+  in sync with ``attendance_student`` by triggers (so bulk writes are covered too);
+* PostgreSQL: ``pg_trgm`` GIN indexes on ``UPPER(column)``, which is exactly the
+  expression Django's ``icontains`` compares, so the planner uses them directly.
+
+Terms shorter than three characters cannot be matched by trigrams and fall back to
+plain ``icontains``.
+"""
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'attendance_student_fts'
+SEARCH_FIELDS = ('name', 'student_id', 'email')
+MIN_INDEXED_LENGTH = 3
+
+_fts_available = None
+
+
+def fts_available():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
+
+
+def _icontains(term, fields, prefix):
+    q = Q()
+    for field in fields:
+        q |= Q(**{f'{prefix}{field}__icontains': term})
+    return q
+
+
+def student_search_q(term, fields=SEARCH_FIELDS, prefix=''):
+    """Return a ``Q`` matching students whose ``fields`` contain ``term``.
+
+    ``prefix`` is the path to the student from the queried model, e.g. ``'student__'``
+    when filtering ``Attendance``.
+    """
+    term = term.strip()
+    if len(term) < MIN_INDEXED_LENGTH or not fts_available():
+        return _icontains(term, fields, prefix)
+    # A quoted FTS5 string is a phrase; with the trigram tokenizer that is a
+    # case-insensitive substring match, the same semantics as icontains.
+    phrase = '"' + term.replace('"', '""') + '"'
+    match = '{%s} : %s' % (' '.join(fields), phrase)
+    return Q(**{f'{prefix}pk__in': RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])})
+
+
+def search_students(queryset, term, fields=SEARCH_FIELDS, prefix=''):
+    if not term or not term.strip():
+        return queryset
+    return queryset.filter(student_search_q(term, fields, prefix))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import dataversion, metrics
+from .models import ClassSettings, Schedule, Section, Student
+from .signin import invalidate_student_index
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def student_changed(sender, **kwargs):
+    invalidate_student_index()
+    dataversion.bump()
+
+
+@receiver(post_delete, sender=Student)
+def student_deleted(sender, **kwargs):
+    # The student's past attendance goes with them.
+    dataversion.bump_history()
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def schedule_changed(sender, **kwargs):
+    # Reload every worker's schedule lookup (attendance.schedules).
+    transaction.on_commit(ClassSettings.bump_version)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects, so add the timer only once.
+    if metrics.time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.time_queries)
@@ -0,0 +1,172 @@
+"""The sign-in write path.
+
+A scan is resolved against a per-worker index of student IDs (no query unless the
+roster changed), classified with the worker's schedule lookup (``attendance.schedules``)
+and then recorded with a single ``INSERT ... ON CONFLICT DO NOTHING`` that reports
+whether the row was new.
+That replaces the ``SELECT`` + ``INSERT`` pair of ``get_or_create`` and cannot raise
+``IntegrityError`` when two scans for the same student race.
+"""
+import time
+import uuid
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import events, rollup
+from .archive import archived_through
+from .models import Attendance, KioskScan, Student
+from .schedules import get_lookup
+
+STUDENT_INDEX_VERSION_KEY = "attendance:student_index:version"
+# Upper bound on how long a worker trusts its index without checking the database,
+# in case a roster change happened outside the app (e.g. raw SQL).
+STUDENT_INDEX_MAX_AGE = 300
+
+# (version, loaded_at, {student_id: (pk, section_id)}) for this worker process.
+_student_index = (None, 0.0, {})
+
+
+def invalidate_student_index():
+    """Make every worker reload its student-ID index once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(STUDENT_INDEX_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def _load_student_index():
+    global _student_index
+    version = cache.get(STUDENT_INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(STUDENT_INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(STUDENT_INDEX_VERSION_KEY)
+    index = {student_id: (pk, section_id)
+             for student_id, pk, section_id in Student.objects.values_list('student_id', 'pk', 'section_id')}
+    _student_index = (version, time.monotonic(), index)
+    return index
+
+
+def lookup_student(student_id):
+    """Return ``(pk, section_id)`` for a scanned student ID, or ``None`` if unknown."""
+    version, loaded_at, index = _student_index
+    if version is None or version != cache.get(STUDENT_INDEX_VERSION_KEY) \
+            or time.monotonic() - loaded_at > STUDENT_INDEX_MAX_AGE:
+        index = _load_student_index()
+    return index.get(student_id)
+
+
+def _archived_through(days):
+    """:func:`attendance.archive.archived_through`, skipping the query when every
+    day is in the current month, which archiving never reaches."""
+    first_open = timezone.localdate().replace(day=1)
+    if all(day >= first_open for day in days):
+        return None
+    return archived_through()
+
+
+def insert_attendance(rows):
+    """Insert ``(student_pk, date, status, timestamp, login_time)`` rows, skipping any
+    (student, date) that already has a row and any date that is already archived.
+
+    Returns the set of ``(student_pk, date)`` pairs that were actually inserted, each
+    also appended to the sign-in event feed. Must be called inside a transaction
+    together with the matching rollup update.
+    """
+    last_archived = _archived_through(row[1] for row in rows)
+    if last_archived is not None:
+        rows = [row for row in rows if row[1] > last_archived]
+    if not rows:
+        return set()
+    ops = connection.ops
+    table = ops.quote_name(Attendance._meta.db_table)
+    columns = ', '.join(ops.quote_name(c) for c in ('student_id', 'date', 'status', 'timestamp', 'login_time'))
+    params = []
+    for student_pk, day, status, timestamp, login_time in rows:
+        params += [
+            student_pk,
+            ops.adapt_datefield_value(day),
+            status,
+            ops.adapt_datetimefield_value(timestamp),
+            ops.adapt_timefield_value(login_time),
+        ]
+    values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))
+    sql = (
+        f"INSERT INTO {table} ({columns}) VALUES {values} "
+        f"ON CONFLICT ({ops.quote_name('student_id')}, {ops.quote_name('date')}) DO NOTHING "
+        f"RETURNING {ops.quote_name('student_id')}, {ops.quote_name('date')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        returned = cursor.fetchall()
+    # SQLite hands raw-cursor dates back as ISO strings.
+    created = {(pk, day if isinstance(day, date) else date.fromisoformat(day)) for pk, day in returned}
+    events.record([
+        (student_pk, day, status, login_time)
+        for student_pk, day, status, _, login_time in rows if (student_pk, day) in created
+    ])
+    return created
+
+
+def record_sign_in(student_pk, day, status, timestamp, login_time):
+    """Record one scan. Returns ``True`` if it created today's row for the student."""
+    with transaction.atomic():
+        created = insert_attendance([(student_pk, day, status, timestamp, login_time)])
+        if created:
+            rollup.record(student_pk, day, status)
+    return bool(created)
+
+
+def record_scan_batch(scans):
+    """Record a batch of kiosk scans given as ``(idempotency_key, student_id, scanned_at)``.
+
+    Scans are classified by their client timestamp with the current schedules and
+    written with one multi-row insert; scans dated in an archived month are
+    refused as ``archived``. Keys seen before return their stored outcome, so
+    replaying a batch costs a single ``SELECT`` and writes nothing.
+
+    Returns ``{idempotency_key: (result, replayed)}``.
+    """
+    keys = {key for key, _, _ in scans}
+    outcomes = {
+        key: (result, True)
+        for key, result in KioskScan.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', 'result')
+    }
+    pending = []
+    seen = set(outcomes)
+    for key, student_id, scanned_at in sorted(scans, key=lambda scan: scan[2]):
+        if key not in seen:
+            seen.add(key)
+            pending.append((key, student_id, scanned_at))
+    if not pending:
+        return outcomes
+
+    lookup = get_lookup()
+    now = timezone.now()
+    last_archived = _archived_through(timezone.localtime(scanned_at).date() for _, _, scanned_at in pending)
+    rows = {}
+    classified = []
+    for key, student_id, scanned_at in pending:
+        student = lookup_student(student_id)
+        local = timezone.localtime(scanned_at)
+        if student is None or (last_archived is not None and local.date() <= last_archived):
+            classified.append((key, student_id, scanned_at, None, 'unknown' if student is None else 'archived'))
+            continue
+        student_pk, section_id = student
+        status = lookup.classify(section_id, local)
+        classified.append((key, student_id, scanned_at, (student_pk, local.date()), status))
+        # Scans are sorted by time, so the first one of the day is the one recorded.
+        rows.setdefault((student_pk, local.date()), (student_pk, local.date(), status, now, local.time()))
+
+    with transaction.atomic():
+        created = insert_attendance(list(rows.values()))
+        rollup.refresh(created)
+        results = []
+        for key, student_id, scanned_at, row_key, status in classified:
+            if row_key is not None and row_key in created:
+                created.discard(row_key)
+            elif row_key is not None:
+                status = 'duplicate'
+            outcomes[key] = (status, False)
+            results.append(KioskScan(idempotency_key=key, student_id=student_id, scanned_at=scanned_at, result=status))
+        KioskScan.objects.bulk_create(results, ignore_conflicts=True)
+    return outcomes
@@ -0,0 +1,898 @@
+import atexit
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time as time_module
+import zlib
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import events, exports, jobs, metrics, rollup, schedules, trends, views
+from .absences import finalize_day, is_day_closed
+from .archive import archive_before
+from .importers import import_students_csv
+from .log import JsonFormatter, QueueingHandler, SamplingFilter
+from .metrics import QueryTimer, collect, metrics_dir
+from .middleware import forget_teacher, resolve_teacher
+from .models import (
+    ArchivedAttendance, Attendance, ClassSettings, Job, MonthlyAttendanceSummary, Schedule, Section, SignInEvent,
+    Student, Teacher,
+)
+from .pagination import decode_cursor, encode_cursor, paginate
+from .reclassify import reclassify
+from .search import search_students
+from .signin import insert_attendance, record_sign_in
+
+# A per-test in-memory cache, so version stamps and cached fragments never leak
+# between tests or runs the way the shared file cache would.
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AttendanceTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def student(self, student_id, name=None, **kwargs):
+        return Student.objects.create(student_id=student_id, name=name or f"Student {student_id}", **kwargs)
+
+    def mark(self, student, day, status, login_time=None):
+        return Attendance.objects.create(student=student, date=day, status=status, login_time=login_time)
+
+
+class ReportQueryTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        today = timezone.localdate()
+        for i in range(5):
+            student = self.student(f"S{i}")
+            self.mark(student, today, 'present')
+            self.mark(student, today - timedelta(days=1), 'late')
+        rollup.rebuild()
+
+    def add_students(self, n):
+        today = timezone.localdate()
+        for i in range(n):
+            self.mark(self.student(f"X{i}"), today, 'absent')
+
+    def test_report_query_count_does_not_grow_with_students(self):
+        # Session user, monthly rollup, students.
+        with self.assertNumQueries(3):
+            response = self.client.get('/report/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Student S4')
+
+        self.add_students(10)
+        # The data-version bump runs on commit, which never happens inside a TestCase;
+        # clearing the cache drops the stale version and report fragment instead.
+        cache.clear()
+        self.client.force_login(User.objects.get(username='staff'))
+        with self.assertNumQueries(3):
+            response = self.client.get('/report/')
+        self.assertContains(response, 'Student X9')
+
+    def test_report_range_adds_one_query_for_partial_months(self):
+        today = timezone.localdate()
+        # Session user, archive boundary, partial-month counts, students.
+        with self.assertNumQueries(4):
+            response = self.client.get('/report/', {'start_date': today, 'end_date': today})
+        self.assertContains(response, '<td>Student S0 (S0)</td>')
+        self.assertContains(response, '100.0%', count=5)
+
+    def test_cached_report_only_reads_the_session_user(self):
+        self.client.get('/report/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/report/')
+        self.assertContains(response, 'Student S0')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/report/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_detailed_log_query_count_does_not_grow_with_page_size(self):
+        # Warm the per-worker lookups (first load creates ClassSettings).
+        self.client.get('/detailed-log/')
+        # Session user, one page with its students.
+        with self.assertNumQueries(2):
+            response = self.client.get('/detailed-log/', {'per_page': 2})
+        self.assertEqual(len(response.context['page']), 2)
+        with self.assertNumQueries(2):
+            response = self.client.get('/detailed-log/', {'per_page': 10})
+        self.assertEqual(len(response.context['page']), 10)
+
+
+    def test_invalid_date_filters_are_ignored(self):
+        today = timezone.localdate()
+        response = self.client.get('/detailed-log/', {'date': today.isoformat()})
+        self.assertEqual({a.date for a in response.context['page']}, {today})
+        for bad in ['bad', '2026-02-30']:
+            with self.subTest(date=bad):
+                response = self.client.get('/detailed-log/', {'date': bad})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page']), 10)
+                self.assertEqual(self.client.get('/report/', {'start_date': bad}).status_code, 200)
+
+class SummarizeTests(AttendanceTestCase):
+    DAYS = [
+        date(2026, 1, 30), date(2026, 1, 31), date(2026, 2, 1), date(2026, 2, 15),
+        date(2026, 2, 28), date(2026, 3, 1), date(2026, 3, 2), date(2026, 4, 30),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.a = self.student('A')
+        self.b = self.student('B')
+        for i, day in enumerate(self.DAYS):
+            self.mark(self.a, day, rollup.STATUSES[i % 3])
+            if i % 2:
+                self.mark(self.b, day, 'late')
+        rollup.rebuild()
+
+    def expected(self, start, end):
+        rows = Attendance.objects.all()
+        if start:
+            rows = rows.filter(date__gte=start)
+        if end:
+            rows = rows.filter(date__lte=end)
+        totals = {}
+        for student_id, status in rows.values_list('student_id', 'status'):
+            totals.setdefault(student_id, dict.fromkeys(rollup.STATUSES, 0))[status] += 1
+        return totals
+
+    def test_matches_direct_counts_at_month_edges(self):
+        ranges = [
+            (None, None),
+            (date(2026, 2, 1), date(2026, 2, 28)),   # exactly one month
+            (date(2026, 2, 2), date(2026, 2, 27)),   # inside one month
+            (date(2026, 1, 31), date(2026, 3, 1)),   # one day either side of a month
+            (date(2026, 1, 31), date(2026, 1, 31)),  # single day
+            (None, date(2026, 2, 15)),
+            (date(2026, 2, 15), None),
+            (date(2026, 1, 1), date(2026, 4, 30)),   # whole months only
+            (date(2026, 3, 3), date(2026, 4, 29)),   # no rows
+        ]
+        for start, end in ranges:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(rollup.summarize(start, end), self.expected(start, end))
+
+    def test_whole_months_do_not_read_attendance(self):
+        Attendance.objects.filter(date__month=2).delete()
+        # The rollup still has February; nothing at the edges is counted directly.
+        self.assertEqual(rollup.summarize(date(2026, 2, 1), date(2026, 2, 28))[self.a.pk],
+                         {'present': 1, 'late': 1, 'absent': 1})
+
+    def test_refresh_locks_the_rows_before_counting(self):
+        MonthlyAttendanceSummary.objects.filter(student=self.a, month=date(2026, 2, 1)).update(present=9)
+        MonthlyAttendanceSummary.objects.filter(student=self.b, month=date(2026, 2, 1)).delete()
+        with CaptureQueriesContext(connection) as queries:
+            rollup.refresh([(self.a.pk, date(2026, 2, 15)), (self.b.pk, date(2026, 2, 1))])
+        february = (date(2026, 2, 1), date(2026, 2, 28))
+        self.assertEqual(rollup.summarize(*february), self.expected(*february))
+        sql = [q['sql'] for q in queries.captured_queries]
+        locked = next(i for i, q in enumerate(sql) if q.startswith('SELECT') and 'monthlyattendancesummary' in q)
+        counted = next(i for i, q in enumerate(sql) if 'FROM "attendance_attendance"' in q)
+        self.assertLess(locked, counted)
+
+    def test_rebuild_reports_progress_per_month(self):
+        calls = []
+        written = rollup.rebuild(progress=calls.append)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(calls[-1], written)
+        self.assertEqual(written, MonthlyAttendanceSummary.objects.count())
+
+
+
+
+
+class TrendsTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        self.open = trends.period_start('month', today)
+        self.last_month = trends.period_start('month', self.open - timedelta(days=1))
+        self.a, b = self.student('A'), self.student('B')
+        self.mark(self.a, self.last_month, 'late')
+        self.mark(b, self.last_month, 'present')
+        self.mark(self.a, today, 'absent')
+
+    def test_closed_periods_are_cached(self):
+        result = trends.trends('month')
+        self.assertEqual([(r['start'], r['total'], r['late_rate'], r['closed']) for r in result],
+                         [(self.last_month, 2, 0.5, True), (self.open, 1, 0.0, False)])
+        # Archive boundary and the open month's counts only.
+        with self.assertNumQueries(2):
+            self.assertEqual(trends.trends('month'), result)
+
+    def test_api_filters_by_student(self):
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        data = self.client.get('/api/trends/', {'period': 'month', 'student': 'A'}).json()
+        self.assertEqual(data['student']['student_id'], 'A')
+        self.assertEqual([(b['late'], b['absent']) for b in data['buckets']], [(1, 0), (0, 1)])
+        self.assertEqual(self.client.get('/api/trends/', {'student': 'nobody'}).status_code, 400)
+
+    def test_validators_change_at_midnight(self):
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get('/api/trends/', {'period': 'month'})
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/trends/', {'period': 'month'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        last_modified = response['Last-Modified']
+        with mock.patch('django.utils.timezone.localdate', return_value=tomorrow):
+            response = self.client.get('/api/trends/', {'period': 'month'}, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            response = self.client.get('/api/trends/', {'period': 'month'}, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 200)
+
+class ArchiveTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.a = self.student('A')
+        for day, status in [(date(2026, 1, 30), 'late'), (date(2026, 2, 27), 'present'), (date(2026, 3, 2), 'absent')]:
+            self.mark(self.a, day, status)
+        rollup.rebuild()
+
+    def test_moves_whole_months_and_keeps_counts(self):
+        before = rollup.summarize(date(2026, 1, 15), date(2026, 3, 2))
+        self.assertEqual(archive_before(date(2026, 3, 15), chunk_size=1), 2)
+        self.assertEqual(list(Attendance.objects.values_list('date', flat=True)), [date(2026, 3, 2)])
+        self.assertEqual(ArchivedAttendance.objects.count(), 2)
+        # Partial months at both edges now read the archive for January.
+        self.assertEqual(rollup.summarize(date(2026, 1, 15), date(2026, 3, 2)), before)
+
+    def test_finalize_refuses_archived_days(self):
+        archive_before(date(2026, 3, 1))
+        with self.assertRaises(CommandError):
+            call_command('finalize_absences', date='2026-02-27', stdout=io.StringIO())
+
+class PaginationTests(AttendanceTestCase):
+    ORDERING = ['-date', 'student__name', 'id']
+
+    def setUp(self):
+        super().setUp()
+        # Shared names and dates so the order relies on every key column.
+        students = [self.student(f"S{i}", name=f"Name {i % 2}") for i in range(4)]
+        for offset in range(3):
+            for student in students:
+                self.mark(student, date(2026, 3, 2) + timedelta(days=offset), 'present')
+        self.rows = Attendance.objects.select_related('student')
+        self.ordered = list(self.rows.order_by(*self.ORDERING).values_list('pk', flat=True))
+
+    def page(self, **cursors):
+        return paginate(self.rows, self.ORDERING, key=lambda a: [a.date.isoformat(), a.student.name, a.pk],
+                        page_size=5, **cursors)
+
+    def test_forward_pages_cover_every_row_once(self):
+        seen = []
+        page = self.page()
+        self.assertIsNone(page.prev_cursor)
+        while True:
+            seen += [a.pk for a in page]
+            if page.next_cursor is None:
+                break
+            page = self.page(after=page.next_cursor)
+        self.assertEqual(seen, self.ordered)
+
+    def test_backward_returns_previous_page(self):
+        first = self.page()
+        second = self.page(after=first.next_cursor)
+        back = self.page(before=second.prev_cursor)
+        self.assertEqual([a.pk for a in back], [a.pk for a in first])
+        self.assertIsNone(back.prev_cursor)
+        self.assertEqual(back.next_cursor, first.next_cursor)
+
+    def test_tampered_cursor_is_ignored(self):
+        cursor = encode_cursor(['2026-03-03', 'Name 0', 1])
+        self.assertEqual(decode_cursor(cursor), ['2026-03-03', 'Name 0', 1])
+        self.assertIsNone(decode_cursor(cursor[:-2] + 'xx'))
+        self.assertEqual([a.pk for a in self.page(after=cursor[:-2] + 'xx')], self.ordered[:5])
+
+
+
+class ReclassifyTests(AttendanceTestCase):
+    def test_applies_default_and_section_rules(self):
+        settings = ClassSettings.get_settings()
+        settings.class_start_time = time(8, 0)
+        settings.late_threshold_minutes = 30
+        settings.save()
+        monday = date(2026, 3, 2)
+        section = Section.objects.create(name='Late starters')
+        Schedule.objects.create(section=section, weekday=monday.weekday(), class_start_time=time(9, 0),
+                                late_threshold_minutes=30)
+        plain = self.student('A')
+        sectioned = self.student('B', section=section)
+        self.mark(plain, monday, 'present', time(8, 10))
+        self.mark(plain, monday + timedelta(days=1), 'absent')
+        self.mark(sectioned, monday, 'late', time(8, 50))
+        # No schedule on Tuesday: the default applies and 08:20 stays late.
+        self.mark(sectioned, monday + timedelta(days=1), 'late', time(8, 20))
+        rollup.rebuild()
+
+        changes = reclassify(settings, monday, monday + timedelta(days=1))
+
+        self.assertEqual(changes, {('present', 'late'): 1, ('late', 'present'): 1})
+        self.assertEqual(Attendance.objects.get(student=plain, date=monday).status, 'late')
+        self.assertEqual(Attendance.objects.get(student=sectioned, date=monday).status, 'present')
+        summary = MonthlyAttendanceSummary.objects.get(student=plain, month=date(2026, 3, 1))
+        self.assertEqual((summary.present, summary.late, summary.absent), (0, 1, 1))
+        self.assertEqual(reclassify(settings, monday, monday + timedelta(days=1)), {})
+
+    def test_sign_in_lookup_uses_the_section_schedule(self):
+        monday = datetime(2026, 3, 2, 8, 20)
+        section = Section.objects.create(name='Late starters')
+        Schedule.objects.create(section=section, weekday=monday.weekday(), class_start_time=time(9, 0),
+                                late_threshold_minutes=30)
+        lookup = schedules.get_lookup()
+        self.assertEqual(lookup.classify(section.pk, monday), 'present')
+        self.assertEqual(lookup.classify(None, monday), 'late')
+        self.assertEqual(lookup.classify(section.pk, monday + timedelta(days=1)), 'late')
+        with self.assertNumQueries(0):
+            schedules.get_lookup()
+
+
+class FinalizeDayTests(AttendanceTestCase):
+    def test_second_run_inserts_nothing(self):
+        day = date(2026, 3, 2)
+        signed_in, missing = self.student('A'), self.student('B')
+        self.student('C')
+        joined_later = self.student('D')
+        Student.objects.exclude(pk=joined_later.pk).update(
+            created_at=timezone.make_aware(datetime.combine(day, time(6, 0))))
+        self.mark(signed_in, day, 'late', time(8, 20))
+
+        self.assertEqual(finalize_day(day), 2)
+        self.assertEqual(finalize_day(day), 0)
+
+        statuses = dict(Attendance.objects.filter(date=day).values_list('student__student_id', 'status'))
+        self.assertEqual(statuses, {'A': 'late', 'B': 'absent', 'C': 'absent'})
+        self.assertEqual(SignInEvent.objects.filter(date=day, status='absent').count(), 2)
+        self.assertEqual(MonthlyAttendanceSummary.objects.get(student=missing, month=date(2026, 3, 1)).absent, 1)
+        self.assertFalse(Attendance.objects.filter(student=joined_later, date=day).exists())
+
+    def test_wrapped_cutoff_keeps_the_day_open_until_midnight(self):
+        wrapped = schedules.Lookup(ClassSettings(class_start_time=time(23, 0), late_threshold_minutes=120), [])
+        self.assertIsNone(wrapped.closing_time(0))
+        self.assertFalse(is_day_closed(timezone.localdate(), wrapped))
+        self.assertTrue(is_day_closed(timezone.localdate() - timedelta(days=1), wrapped))
+        plain = schedules.Lookup(ClassSettings(class_start_time=time(8, 0), late_threshold_minutes=30), [])
+        self.assertEqual(plain.closing_time(0), time(8, 30))
+
+class SearchTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student('A1', 'Ada Lovelace', email='ada@example.com')
+        self.student('B2', 'Grace Hopper')
+        self.student('C3', 'Alan Turing')
+
+    def names(self, term):
+        return sorted(search_students(Student.objects.all(), term).values_list('name', flat=True))
+
+    def test_matches_substrings_like_icontains(self):
+        for term in ['love', 'LOVE', 'ace', 'example', 'b2', 'a', 'zzz']:
+            with self.subTest(term=term):
+                expected = sorted(
+                    Student.objects.filter(name__icontains=term).values_list('name', flat=True).union(
+                        Student.objects.filter(student_id__icontains=term).values_list('name', flat=True),
+                        Student.objects.filter(email__icontains=term).values_list('name', flat=True),
+                    )
+                )
+                self.assertEqual(self.names(term), expected)
+
+    def test_index_follows_updates(self):
+        Student.objects.filter(student_id='C3').update(name='Alan Kay')
+        self.assertEqual(self.names('turing'), [])
+        self.assertEqual(self.names('kay'), ['Alan Kay'])
+
+class ExportTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        self.day = date(2026, 3, 2)
+        self.mark(self.student('A', 'Ada'), self.day, 'present')
+        self.mark(self.student('B', 'Bo'), self.day, 'late')
+
+    def test_csv_export_streams_every_row(self):
+        response = self.client.get('/export-attendance/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'student_id,name,date,status,timestamp')
+        self.assertEqual([line.split(',')[:4] for line in lines[1:]],
+                         [['A', 'Ada', '2026-03-02', 'present'], ['B', 'Bo', '2026-03-02', 'late']])
+
+    def test_gzipped_ndjson_export(self):
+        response = self.client.get('/export-attendance/', {'format': 'ndjson', 'gzip': '1'})
+        self.assertIn('attendance_export.ndjson.gz', response['Content-Disposition'])
+        body = zlib.decompress(b''.join(response.streaming_content), wbits=16 + zlib.MAX_WBITS)
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([(r['student_id'], r['status']) for r in rows], [('A', 'present'), ('B', 'late')])
+
+
+
+class MatrixTests(AttendanceTestCase):
+    def test_grid_merges_archive_and_skips_weekends(self):
+        a, b = self.student('A', 'Ada'), self.student('B', 'Bo')
+        self.student('C', 'Cy')
+        self.mark(a, date(2026, 2, 27), 'late')
+        self.mark(a, date(2026, 2, 28), 'present')  # Saturday
+        self.mark(a, date(2026, 3, 2), 'present')
+        self.mark(b, date(2026, 3, 2), 'absent')
+        archive_before(date(2026, 3, 1))
+
+        header, rows = exports.matrix(date(2026, 2, 27), date(2026, 3, 2))
+        self.assertEqual(header, ['student_id', 'name', '2026-02-27', '2026-03-02', 'present', 'late', 'absent'])
+        self.assertEqual(list(rows), [
+            ['A', 'Ada', 'L', 'P', 1, 1, 0],
+            ['B', 'Bo', '', 'A', 0, 0, 1],
+            ['C', 'Cy', '', '', 0, 0, 0],
+        ])
+
+    def test_rejects_oversized_ranges(self):
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get('/export-attendance/matrix/', {'start_date': '2024-01-01', 'end_date': '2026-01-01'})
+        self.assertEqual(response.status_code, 400)
+
+class ImportTests(AttendanceTestCase):
+    def upload(self, text, **kwargs):
+        return import_students_csv(io.BytesIO(text.encode()), **kwargs)
+
+    def test_creates_updates_and_rejects(self):
+        self.student('A', 'Ada', email='ada@example.com')
+        self.student('B', 'Bo')
+        result = self.upload(
+            'name,student_id,email\n'
+            'Ada,A,ada@example.com\n'
+            'Bob,B,\n'
+            'Cy,C,cy@example.com\n'
+            'Dup,C,\n'
+            'Eve,E,not-an-email\n'
+        )
+        self.assertEqual((result.created, result.updated, result.unchanged, result.rejected), (1, 1, 1, 2))
+        self.assertEqual([(r['line'], r['student_id']) for r in result.rejected_rows], [(5, 'C'), (6, 'E')])
+        self.assertEqual(Student.objects.get(student_id='B').name, 'Bob')
+        self.assertTrue(Student.objects.filter(student_id='C').exists())
+
+    def test_dry_run_writes_nothing(self):
+        result = self.upload('name,student_id,email\nAda,A,\n', dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Student.objects.exists())
+
+    def test_each_chunk_costs_a_fixed_number_of_queries(self):
+        rows = ''.join(f'Student {i},S{i},\n' for i in range(10))
+        # Per chunk: one lookup, then the bulk insert inside its own transaction
+        # (a savepoint under the test's transaction).
+        with self.assertNumQueries(8):
+            self.upload('name,student_id,email\n' + rows, chunk_size=5)
+        self.assertEqual(Student.objects.count(), 10)
+
+    def test_line_numbers_count_quoted_newlines(self):
+        result = self.upload(
+            'name,student_id,email\n'
+            '"Ada\nLovelace",A,\n'
+            'Eve,E,not-an-email\n'
+        )
+        self.assertEqual([r['line'] for r in result.rejected_rows], [4])
+
+    def test_invalid_utf8_late_in_the_file_writes_nothing(self):
+        rows = ''.join(f'Student {i},S{i},\n' for i in range(10)).encode()
+        result = import_students_csv(io.BytesIO(b'name,student_id,email\n' + rows + b'Bad \xff,X,\n'), chunk_size=5)
+        self.assertEqual((result.created, result.rejected), (0, 1))
+        self.assertFalse(Student.objects.exists())
+
+
+class ClassSettingsCacheTests(AttendanceTestCase):
+    def test_cached_settings_reload_only_after_a_save(self):
+        ClassSettings.get_cached()
+        with self.assertNumQueries(0):
+            settings = ClassSettings.get_cached()
+        self.assertEqual(settings.class_start_time, time(8, 0))
+
+        saved = ClassSettings.get_settings()
+        saved.class_start_time = time(9, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            saved.save()
+        self.assertEqual(ClassSettings.get_cached().class_start_time, time(9, 0))
+
+
+class TeacherMiddlewareTests(AttendanceTestCase):
+    def request(self, teacher_id):
+        request = RequestFactory().get('/')
+        request.session = {'teacher_id': teacher_id}
+        return request
+
+    def test_teacher_is_looked_up_once_and_forgotten_on_delete(self):
+        Teacher.objects.create(name='Tess', teacher_id='T1')
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_teacher(self.request('T1')).name, 'Tess')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_teacher(self.request('T1')).name, 'Tess')
+
+        Teacher.objects.filter(teacher_id='T1').delete()
+        forget_teacher('T1')
+        self.assertIsNone(resolve_teacher(self.request('T1')))
+
+    def test_unknown_teacher_is_cached_as_missing(self):
+        self.assertIsNone(resolve_teacher(self.request('nobody')))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_teacher(self.request('nobody')))
+
+
+class SignInTests(AttendanceTestCase):
+    def test_insert_attendance_skips_existing_rows(self):
+        a, b = self.student('A'), self.student('B')
+        day = timezone.localdate()
+        now = timezone.now()
+        with transaction.atomic():
+            created = insert_attendance([(a.pk, day, 'present', now, time(7, 55))])
+        self.assertEqual(created, {(a.pk, day)})
+        with transaction.atomic():
+            created = insert_attendance([
+                (a.pk, day, 'late', now, time(8, 10)),
+                (b.pk, day, 'late', now, time(8, 10)),
+            ])
+        self.assertEqual(created, {(b.pk, day)})
+        self.assertEqual(Attendance.objects.get(student=a).status, 'present')
+        self.assertEqual(SignInEvent.objects.count(), 2)
+
+    def test_insert_attendance_refuses_archived_days(self):
+        a = self.student('A')
+        old = timezone.localdate().replace(day=1) - timedelta(days=40)
+        ArchivedAttendance.objects.create(id=1, student=a, date=old, status='present', timestamp=timezone.now())
+        with transaction.atomic():
+            created = insert_attendance([(a.pk, old - timedelta(days=1), 'late', timezone.now(), None)])
+        self.assertEqual(created, set())
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_record_sign_in_counts_only_the_first_scan(self):
+        a = self.student('A')
+        day = timezone.localdate()
+        self.assertTrue(record_sign_in(a.pk, day, 'late', timezone.now(), time(8, 10)))
+        self.assertFalse(record_sign_in(a.pk, day, 'present', timezone.now(), time(8, 11)))
+        summary = MonthlyAttendanceSummary.objects.get(student=a)
+        self.assertEqual((summary.present, summary.late), (0, 1))
+
+    def test_repeat_scan_is_reported_as_already_signed_in(self):
+        self.student('A')
+        self.client.post('/sign-in/', {'student_id': 'A'})
+        response = self.client.post('/sign-in/', {'student_id': 'A'}, follow=True)
+        self.assertContains(response, 'already signed in today')
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_sign_in_never_touches_the_session(self):
+        self.student('A')
+        self.client.get('/sign-in/')
+        response = self.client.post('/sign-in/', {'student_id': 'A'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('sessionid', response.cookies)
+        self.assertContains(self.client.get(response['Location']), 'Attendance recorded')
+
+
+
+class AsgiTests(AttendanceTestCase):
+    def test_page_views_stay_sync_for_the_wsgi_deployment(self):
+        # Under WSGI an async view costs an async_to_sync hop per request.
+        for view in (views.sign_in, views.attendance_report, views.detailed_attendance_log):
+            with self.subTest(view=view.__name__):
+                self.assertFalse(iscoroutinefunction(view))
+
+    async def test_views_answer_under_asgi(self):
+        await Student.objects.acreate(student_id='A', name='Ada')
+        response = await self.async_client.post('/sign-in/', {'student_id': 'A'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(await Attendance.objects.filter(student__student_id='A').aexists())
+
+        staff = await User.objects.acreate(username='staff', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(staff)
+        for url in ['/report/', '/detailed-log/']:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertContains(response, 'Ada')
+
+    async def test_exports_stream_asynchronously(self):
+        student = await Student.objects.acreate(student_id='A', name='Ada')
+        await Attendance.objects.acreate(student=student, date=date(2026, 3, 2), status='present')
+        staff = await User.objects.acreate(username='staff', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(staff)
+        response = await self.async_client.get('/export-attendance/')
+        # A sync iterator would have been read into a list by the ASGI handler.
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn('A,Ada,2026-03-02,present', body)
+
+
+class EventStreamTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.day = timezone.localdate()
+        self.a, self.b = self.student('A', 'Ada'), self.student('B', 'Bo')
+
+    def test_events_resume_after_the_last_id(self):
+        events.record([(self.a.pk, self.day, 'present', time(7, 50))])
+        first, waiting = events.events_after(0)
+        self.assertEqual(([e.student_id for e in first], waiting), ([self.a.pk], False))
+        events.record([(self.b.pk, self.day, 'late', time(8, 10))])
+        self.assertEqual([e.student_id for e in events.events_after(first[-1].id)[0]], [self.b.pk])
+
+    def test_recent_gap_holds_back_later_events(self):
+        events.record([(self.a.pk, self.day, 'present', None), (self.b.pk, self.day, 'present', None)])
+        first, second = SignInEvent.objects.order_by('id').values_list('id', flat=True)
+        # As if the first event's transaction had not committed yet.
+        SignInEvent.objects.filter(pk=first).delete()
+        self.assertEqual(events.events_after(first - 1), ([], True))
+        SignInEvent.objects.filter(pk=second).update(created_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual([e.pk for e in events.events_after(first - 1)[0]], [second])
+
+    def test_dashboard_counts_today(self):
+        events.record([(self.a.pk, self.day, 'late', None), (self.b.pk, self.day - timedelta(days=1), 'present', None)])
+        SignInEvent.objects.update(created_at=timezone.now() - timedelta(minutes=1))
+        state = events.dashboard_state(self.day)
+        self.assertEqual(state['counts'], {'present': 0, 'late': 1, 'absent': 0})
+        self.assertEqual([e.student_id for e in state['recent']], [self.a.pk])
+
+    def test_stream_under_wsgi_sends_what_is_ready_and_ends(self):
+        events.record([(self.a.pk, self.day, 'present', time(7, 50))])
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get('/dashboard/stream/', {'after': 0})
+        self.assertFalse(response.streaming)
+        self.assertContains(response, '"student_id": "A"')
+        self.assertContains(response, 'retry: ')
+
+    async def test_stream_sends_new_sign_ins(self):
+        await sync_to_async(events.record)([(self.a.pk, self.day, 'present', time(7, 50))])
+        staff = await User.objects.acreate(username='staff', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(staff)
+        with mock.patch.object(views, 'SSE_STREAM_SECONDS', 0.1), mock.patch.object(views, 'SSE_POLL_INTERVAL', 0.01):
+            response = await self.async_client.get('/dashboard/stream/', {'after': 0})
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('"student_id": "A"', body)
+
+    def test_stream_polls_release_the_database_connection(self):
+        events.record([(self.a.pk, self.day, 'present', time(7, 50))])
+        # Outside the test's transaction, as under a real request.
+        with mock.patch.object(connection, 'in_atomic_block', False), mock.patch.object(connection, 'close') as close:
+            batch, _ = views._poll_events(0)
+        self.assertEqual([e.student_id for e in batch], [self.a.pk])
+        close.assert_called_once_with()
+
+
+class DatabaseSettingsTests(TestCase):
+    def test_sqlite_connections_get_the_configured_pragmas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], django_settings.SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+
+@override_settings(KIOSK_API_TOKEN='secret')
+class KioskTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student('S1')
+        self.student('S2')
+        ClassSettings.get_cached()
+
+    def post(self, scans, token='secret'):
+        return self.client.post('/api/kiosk/scans/', json.dumps({'scans': scans}),
+                                content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_replay_returns_stored_results_without_writing(self):
+        at = timezone.now() - timedelta(minutes=5)
+        scans = [
+            {'idempotency_key': 'k1', 'student_id': 'S1', 'scanned_at': at.isoformat()},
+            {'idempotency_key': 'k2', 'student_id': 'S1', 'scanned_at': (at + timedelta(minutes=1)).isoformat()},
+            {'idempotency_key': 'k3', 'student_id': 'nobody', 'scanned_at': at.isoformat()},
+            {'idempotency_key': 'k4', 'student_id': 'S2', 'scanned_at': 'yesterday'},
+        ]
+        first = self.post(scans).json()['results']
+        self.assertIn(first[0]['result'], rollup.STATUSES)
+        self.assertEqual([r['result'] for r in first[1:]], ['duplicate', 'unknown', 'invalid'])
+        self.assertEqual(Attendance.objects.count(), 1)
+
+        with self.assertNumQueries(1):
+            replay = self.post(scans).json()['results']
+        self.assertEqual([r['result'] for r in replay], [r['result'] for r in first])
+        self.assertTrue(all(r['replayed'] for r in replay[:3]))
+        self.assertEqual(Attendance.objects.count(), 1)
+        self.assertEqual(SignInEvent.objects.count(), 1)
+
+    def test_scans_outside_the_replay_window_are_invalid(self):
+        stale = timezone.now() - timedelta(hours=25)
+        result = self.post([{'idempotency_key': 'old', 'student_id': 'S1', 'scanned_at': stale.isoformat()}])
+        self.assertEqual(result.json()['results'][0]['result'], 'invalid')
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_token_is_checked(self):
+        self.assertEqual(self.post([], token='wrong').status_code, 401)
+
+    @override_settings(KIOSK_API_TOKEN='', DEBUG=False)
+    def test_disabled_without_token_unless_debug(self):
+        self.assertEqual(self.post([]).status_code, 503)
+
+
+
+class MetricsTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(METRICS_DIR=tmp.name, METRICS_TOKEN='scrape')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def scrape(self, **headers):
+        return self.client.get('/metrics', **headers)
+
+    def test_requests_and_sign_ins_are_exported(self):
+        self.client.get('/sign-in/')
+        self.client.post('/sign-in/', {'student_id': 'nobody'})
+        response = self.scrape(HTTP_AUTHORIZATION='Bearer scrape')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('attendance_requests_total{view="attendance:sign_in",status="2xx"}', body)
+        self.assertIn('attendance_request_duration_seconds_bucket{view="attendance:sign_in",le="+Inf"}', body)
+        unknown = next(line for line in body.splitlines() if line.startswith('attendance_sign_ins_total{outcome="unknown"}'))
+        self.assertGreaterEqual(int(unknown.split()[-1]), 1)
+
+    def test_snapshots_of_exited_workers_are_removed(self):
+        child = subprocess.Popen([sys.executable, '-c', 'pass'])
+        child.wait()
+        dead = os.path.join(metrics_dir(), f'metrics-{child.pid}-deadbeef.json')
+        os.makedirs(metrics_dir(), exist_ok=True)
+        with open(dead, 'w') as f:
+            json.dump({'views': {}, 'sign_ins': {'unknown': 1000}}, f)
+        views, sign_ins = collect()
+        self.assertFalse(os.path.exists(dead))
+        self.assertLess(sign_ins['unknown'], 1000)
+
+    async def test_queries_are_counted_under_asgi(self):
+        staff = await User.objects.acreate(username='staff', is_staff=True)
+        await sync_to_async(self.async_client.force_login)(staff)
+        before = dict(metrics._views.get('attendance:attendance_report', {'count': 0, 'queries': 0}))
+        await self.async_client.get('/report/')
+        after = metrics._views['attendance:attendance_report']
+        self.assertEqual(after['count'], before['count'] + 1)
+        self.assertGreater(after['queries'], before['queries'])
+
+    def test_scrape_needs_staff_or_token(self):
+        self.assertEqual(self.scrape().status_code, 403)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+
+class LoggingTests(AttendanceTestCase):
+    def record(self, level, **extra):
+        record = logging.LogRecord('attendance.request', level, __file__, 1, 'request', (), None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_json_formatter_includes_extra_fields(self):
+        data = json.loads(JsonFormatter().format(self.record(logging.INFO, view='attendance:sign_in', queries=3)))
+        self.assertEqual((data['level'], data['msg'], data['view'], data['queries']),
+                         ('INFO', 'request', 'attendance:sign_in', 3))
+
+    def test_sampling_never_drops_warnings(self):
+        sampler = SamplingFilter(rate=0)
+        self.assertFalse(sampler.filter(self.record(logging.INFO)))
+        self.assertTrue(sampler.filter(self.record(logging.WARNING)))
+
+    def test_queue_handler_drops_records_when_full(self):
+        handler = QueueingHandler(maxsize=1)
+        self.assertIs(handler.listener.queue, handler.queue)
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        handler.enqueue(self.record(logging.INFO))
+        handler.enqueue(self.record(logging.INFO))
+        self.assertEqual(handler.dropped, 1)
+
+    def test_query_timer_logs_only_slow_queries(self):
+        timer = QueryTimer(slow_query_ms=1)
+        with self.assertLogs('attendance.db', logging.INFO) as logs:
+            timer(lambda *args: time_module.sleep(0.002), 'SELECT slow', None, False, {})
+            timer(lambda *args: None, 'SELECT fast', None, False, {})
+        self.assertEqual([r.sql for r in logs.records if hasattr(r, 'sql')], ['SELECT slow'])
+        self.assertEqual(timer.count, 2)
+
+class CommandTests(AttendanceTestCase):
+    def test_generated_data_is_rolled_up(self):
+        call_command('generate_attendance_data', students=6, days=5, end_date='2026-03-06', seed=1, stdout=io.StringIO())
+        self.assertEqual(Student.objects.count(), 6)
+        self.assertTrue(Attendance.objects.exists())
+        totals = {}
+        for student_id, status in Attendance.objects.values_list('student_id', 'status'):
+            totals.setdefault(student_id, dict.fromkeys(rollup.STATUSES, 0))[status] += 1
+        self.assertEqual(rollup.summarize(), totals)
+
+    def test_benchmark_writes_results(self):
+        self.student('A')
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'benchmark.json')
+            call_command('benchmark_views', views=['attendance_report'], iterations=2, warmup=0,
+                         output=output, stdout=io.StringIO())
+            with open(output) as f:
+                result = json.load(f)['views']['attendance_report']
+        self.assertEqual(result['status'], 200)
+        self.assertGreater(result['queries']['max'], 0)
+
+    def test_benchmark_cleans_up_and_only_writes_with_scratch(self):
+        self.student('A')
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'benchmark.json')
+            call_command('benchmark_views', views=['sign_in', 'kiosk_scans'], iterations=1, warmup=0,
+                         output=output, stdout=io.StringIO())
+            with open(output) as f:
+                self.assertEqual(list(json.load(f)['views']), ['sign_in'])
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(Attendance.objects.exists())
+
+
+class JobTests(AttendanceTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(JOB_RESULTS_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def run_queue(self):
+        call_command('run_jobs', once=True, stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_export_job_writes_its_result_file(self):
+        self.mark(self.student('A'), date(2026, 3, 2), 'present')
+        job = jobs.submit('export_attendance', {'format': 'ndjson'})
+        self.run_queue()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('done', 1))
+        with open(os.path.join(django_settings.JOB_RESULTS_DIR, job.result_file)) as f:
+            self.assertEqual(json.loads(f.read())['student_id'], 'A')
+
+    def test_import_job_reads_the_saved_upload(self):
+        upload = SimpleUploadedFile('roster.csv', b'name,student_id,email\nAda,A,\n')
+        job = jobs.submit('import_students', {'dry_run': False}, upload=upload)
+        self.run_queue()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertTrue(Student.objects.filter(student_id='A').exists())
+
+    def test_failed_job_records_the_error(self):
+        job = jobs.submit('import_students')
+        self.run_queue()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('FileNotFoundError', job.error)
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.submit('rebuild_rollup')
+        Job.objects.filter(pk=job.pk).update(status='running', heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim_next().pk, job.pk)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_worker_prunes_jobs_past_retention(self):
+        upload = SimpleUploadedFile('roster.csv', b'name,student_id,email\nAda,A,\n')
+        old = jobs.submit('import_students', {'dry_run': True}, upload=upload)
+        recent = jobs.submit('rebuild_rollup')
+        queued = jobs.submit('rebuild_rollup')
+        Job.objects.filter(pk=old.pk).update(status='done', finished_at=timezone.now() - timedelta(days=30))
+        Job.objects.filter(pk=recent.pk).update(status='failed', finished_at=timezone.now() - timedelta(days=1))
+        with override_settings(JOB_RETENTION_DAYS=14):
+            self.run_queue()
+        self.assertFalse(os.path.exists(jobs.job_dir(old)))
+        self.assertEqual(set(Job.objects.values_list('id', flat=True)), {recent.pk, queued.pk})
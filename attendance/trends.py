@@ -0,0 +1,89 @@
+"""Weekly and monthly late-rate and absence-rate trends.
+
+:func:`trends` groups attendance rows by ``TruncWeek``/``TruncMonth`` and status in
+the database, so a request reads one small result set instead of every row. Periods
+that have ended are cached indefinitely, keyed on the start of the open period and
+the history version (``attendance.dataversion.bump_history``); only the open period
+is counted on every request.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import dataversion
+from .archive import attendance_sources
+from .rollup import STATUSES
+
+PERIODS = {'week': TruncWeek, 'month': TruncMonth}
+TRENDS_CACHE_PREFIX = "attendance:trends"
+
+
+def period_start(period, day):
+    """First day of the week (Monday) or month containing ``day``."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _counts(period, student_pk=None, start=None, end=None):
+    """``{period_start: {status: n}}`` for rows dated from ``start`` up to, not
+    including, ``end``."""
+    counts = {}
+    for model in attendance_sources(start):
+        rows = model.objects.all()
+        if student_pk is not None:
+            rows = rows.filter(student_id=student_pk)
+        if start is not None:
+            rows = rows.filter(date__gte=start)
+        if end is not None:
+            rows = rows.filter(date__lt=end)
+        grouped = (rows.annotate(bucket=PERIODS[period]('date'))
+                   .values('bucket', 'status').annotate(n=Count('id')).order_by())
+        for row in grouped:
+            bucket = counts.setdefault(row['bucket'], dict.fromkeys(STATUSES, 0))
+            bucket[row['status']] = bucket.get(row['status'], 0) + row['n']
+    return counts
+
+
+def _rate(n, total):
+    return round(n / total, 4) if total else None
+
+
+def trends(period, student_pk=None, start=None, end=None):
+    """Per-period counts and rates for the school, or one student, oldest first.
+
+    Periods overlapping ``start``..``end`` (inclusive, open ended when ``None``) are
+    returned whole. Each entry is ``{'start', 'present', 'late', 'absent', 'total',
+    'late_rate', 'absence_rate', 'closed'}``; rates are ``None`` for an empty period.
+    """
+    open_start = period_start(period, timezone.localdate())
+    token, _ = dataversion.history()
+    key = f"{TRENDS_CACHE_PREFIX}:{period}:{student_pk or 'all'}:{open_start.isoformat()}:{token}"
+    closed = cache.get(key)
+    if closed is None:
+        closed = _counts(period, student_pk, end=open_start)
+        cache.set(key, closed, None)
+
+    counts = dict(closed)
+    if end is None or end >= open_start:
+        counts.update(_counts(period, student_pk, start=open_start))
+
+    first = period_start(period, start) if start else None
+    result = []
+    for bucket in sorted(counts):
+        if (first and bucket < first) or (end and bucket > end):
+            continue
+        c = counts[bucket]
+        total = sum(c.values())
+        result.append({
+            'start': bucket,
+            **{s: c.get(s, 0) for s in STATUSES},
+            'total': total,
+            'late_rate': _rate(c.get('late', 0), total),
+            'absence_rate': _rate(c.get('absent', 0), total),
+            'closed': bucket < open_start,
+        })
+    return result
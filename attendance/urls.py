@@ -5,15 +5,27 @@ app_name = 'attendance'
 
 urlpatterns = [
     path('sign-in/', views.sign_in, name='sign_in'),
+    path('api/kiosk/scans/', views.kiosk_scans, name='kiosk_scans'),
     path('students/', views.student_list, name='student_list'),
     path('import-students/', views.import_students, name='import_students'),
     path('export-attendance/', views.export_attendance, name='export_attendance'),
+    path('export-attendance/matrix/', views.export_attendance_matrix, name='export_attendance_matrix'),
+    path('export-attendance/background/', views.export_attendance_job, name='export_attendance_job'),
     path('report/', views.attendance_report, name='attendance_report'),
+    path('trends/', views.attendance_trends, name='attendance_trends'),
+    path('api/trends/', views.attendance_trends_api, name='attendance_trends_api'),
     path('detailed-log/', views.detailed_attendance_log, name='detailed_log'),
+    path('dashboard/', views.live_dashboard, name='live_dashboard'),
+    path('dashboard/stream/', views.sign_in_stream, name='sign_in_stream'),
     path('class-settings/', views.class_settings, name='class_settings'),
     path('teacher-sign-in/', views.teacher_sign_in, name='teacher_sign_in'),
     path('teacher-sign-out/', views.teacher_sign_out, name='teacher_sign_out'),
     path('manage-teachers/', views.manage_teachers, name='manage_teachers'),
     path('delete-teacher/<str:teacher_id>/', views.delete_teacher, name='delete_teacher'),
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/rebuild-rollup/', views.rebuild_rollup_job, name='rebuild_rollup_job'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
+    path('metrics', views.metrics_view, name='metrics'),
     path('', views.sign_in, name='home'),
 ]
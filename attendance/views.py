@@ -1,71 +1,193 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.decorators import user_passes_test
-from functools import wraps
-from .models import Student, Attendance, ClassSettings
+from functools import partial, wraps
+from .models import Student, Attendance, ClassSettings, Job, Schedule
+from . import dataversion, events, exports, jobs, metrics, rollup, schedules, trends
+from .importers import import_students_csv
+from .middleware import forget_teacher
+from .pagination import approximate_count, paginate
+from .reclassify import describe as describe_reclassification, reclassify
+from .search import search_students
+from .signin import lookup_student, record_scan_batch, record_sign_in
 from .forms import AttendanceSignForm, StudentForm
-from .forms import CSVUploadForm, AttendanceFilterForm, TeacherSignForm
-from django.http import HttpResponse
-import csv
-import io
-from django.db import transaction
-from django.utils.dateparse import parse_date
-from datetime import datetime, time
+from .forms import CSVUploadForm, AttendanceFilterForm, AttendanceExportForm, AttendanceMatrixForm, TeacherSignForm, TrendsForm
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings as django_settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+import asyncio
+import hashlib
+import json
+import os
+from time import monotonic
+from urllib.parse import urlencode
 
-def sign_in(request):
-    # Ensure anonymous student users do not inherit any teacher session
+SIGN_IN_RESULT_SALT = 'attendance.sign_in'
+# How long a sign-in result link keeps showing its message.
+SIGN_IN_RESULT_MAX_AGE = 60
+SIGN_IN_RESULTS = {
+    'present': ('success', 'Attendance recorded. Thank you.'),
+    'late': ('warning', 'Attendance recorded as LATE.'),
+    'absent': ('danger', 'Attendance recorded as ABSENT (beyond late threshold).'),
+    'duplicate': ('info', 'You have already signed in today.'),
+    'unknown': ('danger', 'Student ID not found.'),
+}
+
+
+def _sign_in_result_redirect(outcome):
+    """Redirect back to the form carrying the outcome in a signed query parameter, so
+    a kiosk scan needs neither a session nor a messages cookie."""
+    token = signing.dumps(outcome, salt=SIGN_IN_RESULT_SALT)
+    return redirect(f"{reverse('attendance:sign_in')}?{urlencode({'result': token})}")
+
+
+def _sign_in_result(request):
+    token = request.GET.get('result')
+    if not token:
+        return None
+    try:
+        outcome = signing.loads(token, salt=SIGN_IN_RESULT_SALT, max_age=SIGN_IN_RESULT_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return SIGN_IN_RESULTS.get(outcome)
+
+
+def _drop_teacher_session(request):
     if not request.user.is_staff:
         request.session.pop('is_teacher', None)
         request.session.pop('teacher_id', None)
+
+
+def _record_scan(student_id):
+    """Resolve, classify and record one scan; return the outcome key."""
+    student = lookup_student(student_id)
+    if student is None:
+        return 'unknown'
+    student_pk, section_id = student
+    # Calculate status from the local login time and the student's section schedule
+    now = timezone.now()
+    local_now = timezone.localtime(now)
+    status = schedules.get_lookup().classify(section_id, local_now)
+    created = record_sign_in(student_pk, local_now.date(), status, now, local_now.time())
+    return status if created else 'duplicate'
+
+
+def sign_in(request):
+    # Ensure anonymous student users do not inherit any teacher session. Only a
+    # request that already carries a session cookie can have one, so scans from a
+    # kiosk without one never load or save a session.
+    if django_settings.SESSION_COOKIE_NAME in request.COOKIES:
+        _drop_teacher_session(request)
     if request.method == 'POST':
         form = AttendanceSignForm(request.POST)
         if form.is_valid():
-            student_id = form.cleaned_data['student_id']
-            try:
-                student = Student.objects.get(student_id=student_id)
-            except Student.DoesNotExist:
-                messages.error(request, 'Student ID not found.')
-                return redirect('attendance:sign_in')
-            today = timezone.localdate()
-            
-            # Calculate status based on login time
-            settings = ClassSettings.get_settings()
-            now = timezone.now()
-            login_time = now.time()
-            
-            # Compare login time with class start time
-            status = 'present'
-            if login_time > settings.class_start_time:
-                late_threshold = timezone.datetime.combine(today, settings.class_start_time) + timezone.timedelta(minutes=settings.late_threshold_minutes)
-                if now > late_threshold:
-                    status = 'absent'
-                else:
-                    status = 'late'
-            
-            att, created = Attendance.objects.get_or_create(
-                student=student, 
-                date=today, 
-                defaults={'status': status, 'login_time': login_time}
-            )
-            if created:
-                if status == 'present':
-                    messages.success(request, 'Attendance recorded. Thank you.')
-                elif status == 'late':
-                    messages.warning(request, 'Attendance recorded as LATE.')
-                else:
-                    messages.error(request, 'Attendance recorded as ABSENT (beyond late threshold).')
-            else:
-                messages.info(request, 'You have already signed in today.')
-            return redirect('attendance:sign_in')
+            outcome = _record_scan(form.cleaned_data['student_id'])
+            metrics.record_sign_in(outcome)
+            return _sign_in_result_redirect(outcome)
     else:
         form = AttendanceSignForm()
-    return render(request, 'attendance/sign_in.html', {'form': form, 'is_teacher': False})
+    return render(request, 'attendance/sign_in.html', {
+        'form': form, 'result': _sign_in_result(request), 'is_teacher': False,
+    })
+
+KIOSK_MAX_BATCH = 500
+# How far ahead of the server clock a kiosk timestamp may be before it is rejected.
+KIOSK_MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _kiosk_scan(item, now):
+    """Validate one scan from a kiosk batch; return ``(key, student_id, scanned_at)`` or an error."""
+    if not isinstance(item, dict):
+        return None, 'Each scan must be an object.'
+    key = item.get('idempotency_key')
+    student_id = item.get('student_id')
+    if not isinstance(key, str) or not 0 < len(key) <= 128:
+        return None, 'idempotency_key must be a string of 1-128 characters.'
+    if not isinstance(student_id, str) or not 0 < len(student_id.strip()) <= 64:
+        return None, 'student_id must be a string of 1-64 characters.'
+    raw = item.get('scanned_at')
+    try:
+        scanned_at = parse_datetime(raw) if isinstance(raw, str) else None
+    except ValueError:
+        scanned_at = None
+    if scanned_at is None:
+        return None, 'scanned_at must be an ISO 8601 timestamp.'
+    if timezone.is_naive(scanned_at):
+        scanned_at = timezone.make_aware(scanned_at)
+    if scanned_at > now + KIOSK_MAX_CLOCK_SKEW:
+        return None, 'scanned_at is in the future.'
+    if scanned_at < now - timedelta(hours=django_settings.KIOSK_MAX_BACKLOG_HOURS):
+        return None, f'scanned_at is more than {django_settings.KIOSK_MAX_BACKLOG_HOURS} hours old.'
+    return (key, student_id.strip(), scanned_at), None
+
+
+@csrf_exempt
+@require_POST
+def kiosk_scans(request):
+    """Record a batch of scans replayed by a kiosk or RFID reader.
+
+    Expects ``{"scans": [{"idempotency_key", "student_id", "scanned_at"}, ...]}`` and
+    returns one result per scan, in order. Re-sending a batch returns the original
+    results without writing anything. Scans older than ``KIOSK_MAX_BACKLOG_HOURS``
+    are refused as invalid.
+    """
+    token = django_settings.KIOSK_API_TOKEN
+    if not token and not django_settings.DEBUG:
+        return JsonResponse({'error': 'The kiosk API is disabled until KIOSK_API_TOKEN is set.'}, status=503)
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return JsonResponse({'error': 'Invalid or missing kiosk token.'}, status=401)
+    try:
+        payload = json.loads(request.body)
+        items = payload['scans']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'error': 'Body must be JSON of the form {"scans": [...]}.'}, status=400)
+    if not isinstance(items, list) or len(items) > KIOSK_MAX_BATCH:
+        return JsonResponse({'error': f'scans must be a list of at most {KIOSK_MAX_BATCH} items.'}, status=400)
+
+    now = timezone.now()
+    parsed = [_kiosk_scan(item, now) for item in items]
+    outcomes = record_scan_batch([scan for scan, error in parsed if scan])
+    results = []
+    for item, (scan, error) in zip(items, parsed):
+        if error:
+            key = item.get('idempotency_key') if isinstance(item, dict) else None
+            results.append({'idempotency_key': key, 'result': 'invalid', 'error': error})
+        else:
+            result, replayed = outcomes[scan[0]]
+            if not replayed:
+                metrics.record_sign_in(result)
+            results.append({'idempotency_key': scan[0], 'result': result, 'replayed': replayed})
+    return JsonResponse({'results': results})
+
+
+def _is_teacher_or_staff(request):
+    return request.user.is_staff or bool(request.teacher)
+
 
 def teacher_or_staff_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_wrapped(request, *args, **kwargs):
+            if await sync_to_async(_is_teacher_or_staff)(request):
+                return await view_func(request, *args, **kwargs)
+            return redirect('attendance:teacher_sign_in')
+        return _async_wrapped
+
     @wraps(view_func)
     def _wrapped(request, *args, **kwargs):
-        if request.user.is_staff or request.session.get('is_teacher'):
+        if _is_teacher_or_staff(request):
             return view_func(request, *args, **kwargs)
         return redirect('attendance:teacher_sign_in')
     return _wrapped
@@ -81,18 +203,9 @@ def student_list(request):
             return redirect('attendance:student_list')
     else:
         form = StudentForm()
-    students = Student.objects.all().order_by('name')
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = None
-    if request.session.get('teacher_id'):
-        try:
-            from .models import Teacher
-            t = Teacher.objects.filter(teacher_id=request.session.get('teacher_id')).only('name').first()
-            if t:
-                teacher_name = t.name
-        except Exception:
-            teacher_name = request.session.get('teacher_id')
-    return render(request, 'attendance/student_list.html', {'students': students, 'form': form, 'is_teacher': is_teacher, 'teacher_name': teacher_name})
+    query = request.GET.get('q', '')
+    students = search_students(Student.objects.select_related('section'), query).order_by('name')
+    return render(request, 'attendance/student_list.html', {'students': students, 'form': form, 'query': query})
 
 
 @teacher_or_staff_required
@@ -108,22 +221,14 @@ def manage_teachers(request):
                 messages.info(request, f'Teacher {t.name} already exists.')
             except Teacher.DoesNotExist:
                 t = Teacher.objects.create(name=request.POST.get('name', teacher_id), teacher_id=teacher_id, pin=pin)
+                forget_teacher(teacher_id)
                 messages.success(request, f'Teacher {t.name} created.')
             return redirect('attendance:manage_teachers')
     else:
         form = TeacherSignForm()
     from .models import Teacher
     teachers = Teacher.objects.all().order_by('name')
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = None
-    if request.session.get('teacher_id'):
-        try:
-            t = Teacher.objects.filter(teacher_id=request.session.get('teacher_id')).only('name').first()
-            if t:
-                teacher_name = t.name
-        except Exception:
-            teacher_name = request.session.get('teacher_id')
-    return render(request, 'attendance/manage_teachers.html', {'teachers': teachers, 'form': form, 'is_teacher': is_teacher, 'teacher_name': teacher_name})
+    return render(request, 'attendance/manage_teachers.html', {'teachers': teachers, 'form': form})
 
 
 @user_passes_test(lambda u: u.is_staff)
@@ -132,6 +237,7 @@ def delete_teacher(request, teacher_id):
     try:
         t = Teacher.objects.get(teacher_id=teacher_id)
         t.delete()
+        forget_teacher(teacher_id)
         messages.success(request, f'Teacher {t.name} deleted.')
     except Teacher.DoesNotExist:
         messages.error(request, 'Teacher not found.')
@@ -157,6 +263,7 @@ def teacher_sign_in(request):
             # successful sign-in
             request.session['is_teacher'] = True
             request.session['teacher_id'] = tid
+            forget_teacher(tid)
             messages.success(request, f'Welcome, {teacher.name}.')
             return redirect('attendance:student_list')
     else:
@@ -165,15 +272,8 @@ def teacher_sign_in(request):
 
 
 def teacher_sign_out(request):
-    teacher_name = None
-    if request.session.get('is_teacher'):
-        # Get teacher name before clearing session
-        from .models import Teacher
-        try:
-            teacher = Teacher.objects.get(teacher_id=request.session.get('teacher_id'))
-            teacher_name = teacher.name
-        except:
-            pass
+    # Get teacher name before clearing session
+    teacher_name = request.teacher.name if request.teacher else None
     
     request.session.pop('is_teacher', None)
     request.session.pop('teacher_id', None)
@@ -188,127 +288,379 @@ def teacher_sign_out(request):
 
 @teacher_or_staff_required
 def import_students(request):
+    result = None
     if request.method == 'POST':
         form = CSVUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            f = form.cleaned_data['csv_file']
-            decoded = f.read().decode('utf-8')
-            reader = csv.DictReader(io.StringIO(decoded))
-            created = 0
-            updated = 0
-            with transaction.atomic():
-                for row in reader:
-                    name = row.get('name') or row.get('Name')
-                    student_id = row.get('student_id') or row.get('studentId') or row.get('student')
-                    email = row.get('email') or row.get('Email') or ''
-                    if not student_id:
-                        continue
-                    obj, was_created = Student.objects.update_or_create(
-                        student_id=student_id.strip(),
-                        defaults={'name': (name or '').strip(), 'email': (email or '').strip()}
-                    )
-                    if was_created:
-                        created += 1
-                    else:
-                        updated += 1
-            messages.success(request, f'Import complete: {created} created, {updated} updated.')
-            return redirect('attendance:student_list')
+            if form.cleaned_data['background']:
+                job = jobs.submit('import_students', {'dry_run': form.cleaned_data['dry_run']},
+                                  created_by=_job_owner(request), upload=form.cleaned_data['csv_file'])
+                return redirect('attendance:job_status', job_id=job.pk)
+            result = import_students_csv(form.cleaned_data['csv_file'], dry_run=form.cleaned_data['dry_run'])
+            if not result.dry_run:
+                if result.rejected:
+                    messages.warning(request, result.summary())
+                else:
+                    messages.success(request, result.summary())
+                return redirect('attendance:student_list')
     else:
         form = CSVUploadForm()
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = request.session.get('teacher_id')
-    return render(request, 'attendance/import_students.html', {'form': form, 'is_teacher': is_teacher, 'teacher_name': teacher_name})
+    return render(request, 'attendance/import_students.html', {'form': form, 'result': result})
+
+
+def _data_validators(request, day=None):
+    """``(etag, last_modified)`` for pages built from attendance data. The ETag covers
+    the data version, the exact query and who is looking (the navigation bar differs
+    per viewer), plus ``day`` for pages whose content follows the current date."""
+    version, modified_at = dataversion.current()
+    viewer = f"{request.user.pk or ''}:{getattr(request.teacher, 'teacher_id', '')}"
+    key = f"{version}|{request.get_full_path()}|{viewer}"
+    if day is not None:
+        key += f"|{day.isoformat()}"
+        # A copy from before local midnight must not satisfy If-Modified-Since either.
+        midnight = timezone.make_aware(datetime.combine(day, time.min)).timestamp()
+        modified_at = max(modified_at, midnight)
+    etag = hashlib.md5(key.encode()).hexdigest()
+    return quote_etag(etag), int(modified_at)
+
+
+def _with_validators(request, response, etag, last_modified):
+    if request.method in ('GET', 'HEAD'):
+        if not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(last_modified)
+        response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _conditional(view_func, validators):
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        etag, last_modified = validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        return _with_validators(request, response, etag, last_modified)
+    return _wrapped
+
+
+def data_conditional(view_func):
+    """Serve ETag/Last-Modified from the data version; browsers revalidate on every
+    load and get a 304 until attendance data changes."""
+    return _conditional(view_func, _data_validators)
+
+
+def daily_data_conditional(view_func):
+    """:func:`data_conditional` for views whose output also depends on today's date
+    (a default range ending today, the open trend period): validators also change at
+    local midnight."""
+    return _conditional(view_func, lambda request: _data_validators(request, timezone.localdate()))
+
+
+# Read size for job result downloads; under ASGI each block is one thread hop.
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+
+def _streaming(request, response):
+    """Return ``response``, switched to an async iterator when served over ASGI so its
+    body is sent as it is produced rather than collected in memory first."""
+    if isinstance(request, ASGIRequest) and not response.is_async:
+        response.streaming_content = exports.async_chunks(response.streaming_content)
+    return response
 
 
 @teacher_or_staff_required
+@data_conditional
 def export_attendance(request):
-    form = AttendanceFilterForm(request.GET or None)
+    form = AttendanceExportForm(request.GET or None)
     start = None
     end = None
+    fmt = 'csv'
+    compress = False
     if form.is_valid():
         start = form.cleaned_data.get('start_date')
         end = form.cleaned_data.get('end_date')
-    qs = Attendance.objects.select_related('student').order_by('date')
-    if start:
-        qs = qs.filter(date__gte=start)
-    if end:
-        qs = qs.filter(date__lte=end)
-
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="attendance_export.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['student_id', 'name', 'date', 'status', 'timestamp'])
-    for a in qs:
-        writer.writerow([a.student.student_id, a.student.name, a.date.isoformat(), a.status, a.timestamp.isoformat()])
-    return response
+        fmt = form.cleaned_data.get('format') or 'csv'
+        compress = form.cleaned_data.get('gzip')
+
+    # Stream the export so memory stays flat no matter how many rows are selected
+    chunks, content_type, extension = exports.export_stream(fmt, exports.attendance_rows(start, end), compress)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="attendance_export.{extension}"'
+    return _streaming(request, response)
+
+
+@teacher_or_staff_required
+@daily_data_conditional
+def export_attendance_matrix(request):
+    """Student x school-day grid of status codes as CSV, streamed one student at a time."""
+    form = AttendanceMatrixForm(request.GET or None)
+    if form.is_bound and not form.is_valid():
+        return HttpResponse('Invalid dates.', status=400, content_type='text/plain')
+    data = form.cleaned_data if form.is_bound else {}
+    end = data.get('end_date') or timezone.localdate()
+    start = data.get('start_date') or end - timedelta(days=exports.MATRIX_DEFAULT_DAYS - 1)
+    if start > end or (end - start).days >= exports.MATRIX_MAX_DAYS:
+        return HttpResponse(f'Choose a range of at most {exports.MATRIX_MAX_DAYS} days.', status=400,
+                            content_type='text/plain')
+
+    header, rows = exports.matrix(start, end, data.get('include_weekends', False))
+    chunks = exports.csv_stream(rows, header)
+    content_type, filename = 'text/csv', f'attendance_matrix_{start}_{end}.csv'
+    if data.get('gzip'):
+        chunks, content_type, filename = exports.gzip_stream(chunks), 'application/gzip', filename + '.gz'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return _streaming(request, response)
+
+
+@teacher_or_staff_required
+@require_POST
+def export_attendance_job(request):
+    """Queue an export to run in the background instead of inside the request."""
+    form = AttendanceExportForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, 'Invalid export options.')
+        return redirect('attendance:attendance_report')
+    start = form.cleaned_data.get('start_date')
+    end = form.cleaned_data.get('end_date')
+    job = jobs.submit('export_attendance', {
+        'start': start.isoformat() if start else None,
+        'end': end.isoformat() if end else None,
+        'format': form.cleaned_data.get('format') or 'csv',
+        'gzip': form.cleaned_data.get('gzip'),
+    }, created_by=_job_owner(request))
+    return redirect('attendance:job_status', job_id=job.pk)
+
+
+def _report_row(student, counts):
+    c = counts.get(student.pk) or dict.fromkeys(rollup.STATUSES, 0)
+    total = c['present'] + c['late'] + c['absent']
+    pct = (c['present'] / total * 100) if total else None
+    return {'student': student, 'present': c['present'], 'late': c['late'], 'absent': c['absent'], 'total': total, 'pct': pct}
+
+
+def _report_rows(start_date, end_date):
+    counts = rollup.summarize(start_date, end_date)
+    return [_report_row(s, counts) for s in Student.objects.order_by('name')]
+
+
+def _parse_date_param(value):
+    """``YYYY-MM-DD`` from a query parameter as a date; ``None`` when missing or invalid."""
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        # Well formed but impossible, e.g. 2026-02-30.
+        return None
 
 
 @teacher_or_staff_required
+@data_conditional
 def attendance_report(request):
     form = AttendanceFilterForm(request.GET or None)
     start = form['start_date'].value() if form.is_bound else None
     end = form['end_date'].value() if form.is_bound else None
-    start_date = parse_date(start) if start else None
-    end_date = parse_date(end) if end else None
-
-    students = Student.objects.all().order_by('name')
-    report = []
-    for s in students:
-        qs = Attendance.objects.filter(student=s)
-        if start_date:
-            qs = qs.filter(date__gte=start_date)
-        if end_date:
-            qs = qs.filter(date__lte=end_date)
-        present = qs.filter(status='present').count()
-        late = qs.filter(status='late').count()
-        total = qs.count()
-        absent = qs.filter(status='absent').count()
-        pct = (present / total * 100) if total else None
-        report.append({'student': s, 'present': present, 'late': late, 'absent': absent, 'total': total, 'pct': pct})
-
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = request.session.get('teacher_id')
+    start_date = _parse_date_param(start)
+    end_date = _parse_date_param(end)
+
+    # The template caches the table per range and data version and only calls this
+    # when that fragment is missing. Counts come from the monthly rollup (plus the
+    # partial months at the edges of the range), so the cost follows the number of
+    # students.
+    report = partial(_report_rows, start_date, end_date)
+
+    version, modified_at = dataversion.current()
     return render(request, 'attendance/attendance_report.html', {
         'form': form, 
         'report': report, 
-        'is_teacher': is_teacher, 
-        'teacher_name': teacher_name,
         'start_date': start_date,
-        'end_date': end_date
+        'end_date': end_date,
+        'data_version': version,
+        'data_modified': datetime.fromtimestamp(modified_at, dt_timezone.utc),
+    })
+
+
+def _trends(request):
+    """Validate the trend filters; return ``(form, result)`` with ``result`` ``None``
+    when the form is invalid."""
+    form = TrendsForm(request.GET)
+    if not form.is_valid():
+        return form, None
+    data = form.cleaned_data
+    period = data['period'] or 'week'
+    student = data['student']
+    result = {
+        'period': period,
+        'student': student,
+        'buckets': trends.trends(period, student.pk if student else None, data['start_date'], data['end_date']),
+    }
+    return form, result
+
+
+@teacher_or_staff_required
+@daily_data_conditional
+def attendance_trends(request):
+    """Weekly or monthly late and absence rates for the school or one student."""
+    form, result = _trends(request)
+    return render(request, 'attendance/trends.html', {'form': form, 'result': result})
+
+
+@teacher_or_staff_required
+@daily_data_conditional
+def attendance_trends_api(request):
+    """JSON version of :func:`attendance_trends`."""
+    form, result = _trends(request)
+    if result is None:
+        return JsonResponse({'errors': form.errors}, status=400)
+    student = result['student']
+    return JsonResponse({
+        'period': result['period'],
+        'student': {'student_id': student.student_id, 'name': student.name} if student else None,
+        'buckets': [{**b, 'start': b['start'].isoformat()} for b in result['buckets']],
     })
 
 
+LOG_PAGE_SIZE = 50
+LOG_MAX_PAGE_SIZE = 500
+
+
 @teacher_or_staff_required
 def detailed_attendance_log(request):
-    """Display detailed attendance log with login times and status"""
-    from django.db.models import Q
-    
-    filter_date = request.GET.get('date')
+    """Display detailed attendance log with login times and status, one keyset page at a time"""
+    # A malformed ?date= is ignored rather than handed to the ORM.
+    filter_date = _parse_date_param(request.GET.get('date'))
     filter_student = request.GET.get('student')
+    try:
+        per_page = min(max(int(request.GET.get('per_page', LOG_PAGE_SIZE)), 1), LOG_MAX_PAGE_SIZE)
+    except ValueError:
+        per_page = LOG_PAGE_SIZE
     
-    attendances = Attendance.objects.select_related('student').all().order_by('-date', 'student__name')
+    attendances = Attendance.objects.select_related('student').all()
     
     if filter_date:
         attendances = attendances.filter(date=filter_date)
     if filter_student:
-        attendances = attendances.filter(student__name__icontains=filter_student)
+        attendances = search_students(attendances, filter_student, fields=('name',), prefix='student__')
     
-    settings = ClassSettings.get_settings()
+    page = paginate(
+        attendances,
+        ['-date', 'student__name', 'id'],
+        key=lambda a: [a.date.isoformat(), a.student.name, a.pk],
+        page_size=per_page,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    total = approximate_count(attendances) if request.GET.get('count') else None
     
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = request.session.get('teacher_id')
+    settings = ClassSettings.get_cached()
+    # Remarks quote the rule each row was classified under (section schedule or default).
+    lookup = schedules.get_lookup()
+    for att in page:
+        att.rule = lookup.rule(att.student.section_id, att.date.weekday())
+    
+    # Query string for the pager links: the current filters without the cursors
+    params = request.GET.copy()
+    for name in ('after', 'before'):
+        params.pop(name, None)
     
     return render(request, 'attendance/detailed_log.html', {
-        'attendances': attendances,
+        'attendances': page,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'page_query': params.urlencode(),
         'settings': settings,
-        'is_teacher': is_teacher,
-        'teacher_name': teacher_name,
-        'filter_date': filter_date,
+        'filter_date': filter_date.isoformat() if filter_date else '',
         'filter_student': filter_student
     })
 
 
+@teacher_or_staff_required
+def live_dashboard(request):
+    """Today's sign-ins and running counters, updated by :func:`sign_in_stream`."""
+    day = timezone.localdate()
+    return render(request, 'attendance/dashboard.html', {'day': day, **events.dashboard_state(day)})
+
+
+# Browsers reconnect after a closed stream, so each response is kept short: a client
+# that went away is dropped within this many seconds even when nothing is written.
+SSE_STREAM_SECONDS = 60
+SSE_POLL_INTERVAL = 1.0
+SSE_KEEPALIVE_SECONDS = 15
+SSE_RETRY_MS = 2000
+
+
+def _poll_events(last_id):
+    """:func:`events.events_after`, closing the database connection afterwards.
+
+    A stream spends nearly all its time asleep between polls; without this each open
+    dashboard would pin a connection (and under ``DB_CONN_MAX_AGE`` keep it) for
+    the whole stream. Reconnecting costs one connect per poll that finds a new event.
+    """
+    try:
+        return events.events_after(last_id)
+    finally:
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+async def _sign_in_event_stream(last_id, day, duration):
+    yield f"retry: {SSE_RETRY_MS}\n\n"
+    deadline = monotonic() + duration
+    last_sent = monotonic()
+    version = None
+    waiting = False
+    while True:
+        # Every write that appends an event also bumps the data version, so an idle
+        # stream costs a cache read per poll rather than a query.
+        current, _ = await dataversion.acurrent()
+        if current != version or waiting:
+            version = current
+            batch, waiting = await sync_to_async(_poll_events)(last_id)
+            for event in batch:
+                last_id = event.id
+                if event.date == day:
+                    yield f"id: {event.id}\ndata: {json.dumps(events.as_json(event))}\n\n"
+                    last_sent = monotonic()
+            if batch and batch[-1].date != day:
+                # A bare id moves the browser's Last-Event-ID past skipped events.
+                yield f"id: {last_id}\n\n"
+            if waiting and len(batch) == events.BATCH_SIZE and monotonic() < deadline:
+                continue
+        if monotonic() >= deadline:
+            return
+        if monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+            yield ": keepalive\n\n"
+            last_sent = monotonic()
+        await asyncio.sleep(SSE_POLL_INTERVAL)
+
+
+@teacher_or_staff_required
+async def sign_in_stream(request):
+    """Server-sent events for new sign-ins on ``?date=`` (default today).
+
+    Resumes after the browser's ``Last-Event-ID`` header or, on the first
+    connection, the ``?after=`` ID the dashboard was rendered with.
+    """
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        last_id = 0
+    day = _parse_date_param(request.GET.get('date')) or timezone.localdate()
+    if isinstance(request, ASGIRequest):
+        stream = _sign_in_event_stream(last_id, day, SSE_STREAM_SECONDS)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    else:
+        # A WSGI worker cannot hold a stream open without blocking, so send what is
+        # ready and end; the browser reconnects after SSE_RETRY_MS.
+        chunks = [chunk async for chunk in _sign_in_event_stream(last_id, day, 0)]
+        response = HttpResponse(''.join(chunks), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @teacher_or_staff_required
 def class_settings(request):
     """Manage class settings like start time"""
@@ -325,17 +677,65 @@ def class_settings(request):
                 settings.late_threshold_minutes = int(late_threshold)
             
             settings.save()
+            # Re-read so class_start_time is a time rather than the posted string.
+            settings.refresh_from_db()
             messages.success(request, f'Settings updated. Class starts at {settings.class_start_time.strftime("%I:%M %p")}. Late threshold: {settings.late_threshold_minutes} minutes.')
+            if request.POST.get('reclassify'):
+                start = parse_date(request.POST.get('reclassify_start') or '')
+                end = parse_date(request.POST.get('reclassify_end') or '')
+                messages.info(request, describe_reclassification(reclassify(settings, start, end)))
         except Exception as e:
             messages.error(request, f'Error saving settings: {str(e)}')
         return redirect('attendance:class_settings')
     
-    is_teacher = request.user.is_staff or bool(request.session.get('is_teacher'))
-    teacher_name = request.session.get('teacher_id')
-    
     return render(request, 'attendance/class_settings.html', {
         'settings': settings,
-        'is_teacher': is_teacher,
-        'teacher_name': teacher_name
+        'schedules': Schedule.objects.select_related('section').order_by('section__name', 'weekday'),
     })
 
+
+def _job_owner(request):
+    return request.teacher.teacher_id if request.teacher else request.user.get_username()
+
+
+@teacher_or_staff_required
+def job_list(request):
+    return render(request, 'attendance/job_list.html', {'jobs': Job.objects.order_by('-id')[:50]})
+
+
+@teacher_or_staff_required
+def job_status(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    return render(request, 'attendance/job_status.html', {'job': job})
+
+
+@teacher_or_staff_required
+def job_download(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, status='done')
+    if not job.result_file:
+        raise Http404('This job has no file.')
+    path = os.path.join(django_settings.JOB_RESULTS_DIR, job.result_file)
+    if not os.path.exists(path):
+        raise Http404('The result file is no longer available.')
+    response = FileResponse(open(path, 'rb'), as_attachment=True, filename=job.result_name,
+                            content_type=job.content_type or None)
+    response.block_size = DOWNLOAD_BLOCK_SIZE
+    return _streaming(request, response)
+
+
+@teacher_or_staff_required
+@require_POST
+def rebuild_rollup_job(request):
+    job = jobs.submit('rebuild_rollup', created_by=_job_owner(request))
+    return redirect('attendance:job_status', job_id=job.pk)
+
+
+def metrics_view(request):
+    """Prometheus metrics for all workers; staff only, or a scraper with METRICS_TOKEN."""
+    token = django_settings.METRICS_TOKEN
+    authorized = request.user.is_staff or (
+        token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    )
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
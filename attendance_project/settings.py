@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from decouple import config, Csv
 
 # Django Attendance System
@@ -27,11 +28,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "attendance.metrics.MetricsMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "attendance.middleware.TeacherMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -56,6 +59,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "attendance_project.wsgi.application"
+ASGI_APPLICATION = "attendance_project.asgi.application"
 
 # Database configuration - supports both SQLite and PostgreSQL
 if config('DB_ENGINE', default='sqlite') == 'postgresql':
@@ -63,17 +67,90 @@ if config('DB_ENGINE', default='sqlite') == 'postgresql':
     DATABASES = {
         'default': dj_database_url.config(
             default=config('DATABASE_URL'),
-            conn_max_age=600
+            conn_max_age=config('DB_CONN_MAX_AGE', default=600, cast=int),
+            # Persistent connections are checked before reuse, so a restarted server
+            # or a pooler closing idle connections does not surface as a 500.
+            conn_health_checks=True,
         )
     }
+    # Behind PgBouncer in transaction pooling mode a connection may change between
+    # statements, which server-side cursors (used by QuerySet.iterator()) do not
+    # survive; exports then fetch each chunk with a plain query instead.
+    if config('DB_PGBOUNCER', default=False, cast=bool):
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "OPTIONS": {
+                # Seconds a connection waits for a lock before "database is locked".
+                "timeout": config('SQLITE_TIMEOUT', default=20, cast=int),
+            },
         }
     }
 
+# Applied to every new SQLite connection (attendance.signals.configure_sqlite). WAL lets
+# readers run alongside the single writer, NORMAL sync is safe with WAL and avoids an
+# fsync per commit, and a negative cache_size is in KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=20000, cast=int),
+    'cache_size': -config('SQLITE_CACHE_KB', default=20000, cast=int),
+    'temp_store': 'MEMORY',
+}
+
+# Shared cache. Cross-worker invalidation (e.g. of ClassSettings and the report
+# fragments) needs every web and worker process, on every host, to see the same
+# cache: Redis when REDIS_URL is set, otherwise the database cache table (created by
+# build.sh). The development server is a single process, so DEBUG uses local memory.
+# CACHE_BACKEND and CACHE_LOCATION override the choice, e.g. for memcached.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    _cache_backend, _cache_location = 'django.core.cache.backends.redis.RedisCache', REDIS_URL
+elif DEBUG:
+    _cache_backend, _cache_location = 'django.core.cache.backends.locmem.LocMemCache', 'attendance'
+else:
+    _cache_backend, _cache_location = 'django.core.cache.backends.db.DatabaseCache', 'attendance_cache'
+CACHES = {
+    "default": {
+        "BACKEND": config('CACHE_BACKEND', default=_cache_backend),
+        "LOCATION": config('CACHE_LOCATION', default=_cache_location),
+    }
+}
+
+# Sessions are only needed for teacher and admin pages; keep them in the shared cache
+# with the database as backing store. Messages live in a cookie so reading them never
+# loads a session. Kiosk sign-ins touch neither (see attendance.views.sign_in).
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Shared secret for the kiosk batch sign-in API. Required unless DEBUG is on: without
+# it the API refuses every request.
+KIOSK_API_TOKEN = config('KIOSK_API_TOKEN', default='')
+# Oldest scan, in hours before now, that a kiosk may still replay.
+KIOSK_MAX_BACKLOG_HOURS = config('KIOSK_MAX_BACKLOG_HOURS', default=24, cast=int)
+
+# Per-worker metrics snapshots are written here and summed by the /metrics view.
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(tempfile.gettempdir(), 'attendance_metrics'))
+# Bearer token that lets a Prometheus scraper read /metrics without a staff login.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Uploads waiting for, and files produced by, background jobs (manage.py run_jobs).
+# Must be shared by the web and worker processes.
+JOB_RESULTS_DIR = config('JOB_RESULTS_DIR', default=str(BASE_DIR / 'job_results'))
+# manage.py run_jobs deletes finished jobs, and their files, this many days later.
+JOB_RETENTION_DAYS = config('JOB_RETENTION_DAYS', default=14, cast=int)
+
+# manage.py archive_attendance moves whole months older than this many days out of the
+# hot Attendance table.
+ATTENDANCE_ARCHIVE_AFTER_DAYS = config('ATTENDANCE_ARCHIVE_AFTER_DAYS', default=730, cast=int)
+
+# Sign-in events feed only the live dashboard; manage.py finalize_absences deletes
+# those older than this many days.
+SIGN_IN_EVENT_RETENTION_DAYS = config('SIGN_IN_EVENT_RETENTION_DAYS', default=7, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = "en-us"
@@ -87,29 +164,70 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 LOGIN_URL = "/admin/login/"
-# Logging configuration for debugging
+
+# Logging. Records go through a bounded queue to a background writer thread, so
+# request threads never block on stdout/stderr.
+#   LOG_JSON     one JSON object per line (default in production)
+#   LOG_SQL      'all' logs every query (DEBUG only), 'slow' only queries slower than
+#                SLOW_QUERY_MS, 'off' none
+#   *_SAMPLE_RATE share of request / slow-query records kept (warnings always kept)
+LOG_LEVEL = config('LOG_LEVEL', default='DEBUG' if DEBUG else 'INFO')
+LOG_JSON = config('LOG_JSON', default=not DEBUG, cast=bool)
+LOG_SQL = config('LOG_SQL', default='all' if DEBUG else 'slow')
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=200, cast=int)
+REQUEST_LOG_SAMPLE_RATE = config('REQUEST_LOG_SAMPLE_RATE', default=1.0 if DEBUG else 0.05, cast=float)
+SLOW_QUERY_LOG_SAMPLE_RATE = config('SLOW_QUERY_LOG_SAMPLE_RATE', default=1.0, cast=float)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'attendance.log.JsonFormatter',
+        },
+        'plain': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'filters': {
+        'sample_requests': {
+            '()': 'attendance.log.SamplingFilter',
+            'rate': REQUEST_LOG_SAMPLE_RATE,
+        },
+        'sample_slow_queries': {
+            '()': 'attendance.log.SamplingFilter',
+            'rate': SLOW_QUERY_LOG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'attendance.log.QueueingHandler',
+            'formatter': 'json' if LOG_JSON else 'plain',
         },
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG',
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': LOG_LEVEL,
             'propagate': False,
         },
+        'django.db.backends': {
+            'level': 'DEBUG' if LOG_SQL == 'all' else 'INFO',
+        },
         'attendance': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': LOG_LEVEL,
             'propagate': False,
         },
+        'attendance.request': {
+            'filters': ['sample_requests'],
+        },
+        'attendance.db': {
+            'filters': ['sample_slow_queries'],
+        },
     },
-}
\ No newline at end of file
+}
@@ -20,6 +20,9 @@ python manage.py migrate --verbosity 2
 
 echo "==> Migrations completed successfully"
 
+# Table for the shared cache when REDIS_URL is not set (no-op otherwise)
+python manage.py createcachetable
+
 # Create admin teacher if it doesn't exist
 echo "==> Creating teacher accounts..."
 python manage.py shell -c "
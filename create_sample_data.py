@@ -7,6 +7,7 @@ django.setup()
 from django.utils import timezone
 from datetime import time
 from attendance.models import Student, Attendance, ClassSettings
+from attendance import rollup
 
 # Initialize class settings if not exists
 settings = ClassSettings.get_settings()
@@ -36,6 +37,9 @@ try:
         defaults={'status': 'late', 'login_time': late_time}
     )
     print(f"✓ Ryan James Clemente: Late at {late_time.strftime('%I:%M %p')}")
+
+    # update_or_create bypasses the sign-in path, so resync the monthly rollup
+    rollup.refresh([(aira.pk, today), (ryan.pk, today)])
     
     print(f"\nClass Settings: {settings}")
     print(f"Present: Login at or before {settings.class_start_time.strftime('%I:%M %p')}")